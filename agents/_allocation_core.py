@@ -0,0 +1,66 @@
+"""
+Allocation Core - Numeric kernels for fallback allocation and validation
+
+Rank-proportional splitting of the available resources across zones, and
+scaling of model allocations that exceed what is available.
+"""
+import numpy as np
+from utils.jit import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def proportional_alloc(caps, n, share=0.9):
+    """
+    Rank-proportional split of the available resources
+
+    Zone i (0 = highest priority) receives (n - i) / (1 + 2 + ... + n)
+    of share * caps.
+
+    Args:
+        caps: float64 array of available quantities per resource
+              (FALLBACK_KEYS order in agents._constants)
+        n: Number of zones
+        share: Fraction of each resource to hand out
+
+    Returns:
+        (n, len(caps)) int64 matrix of quantities per zone
+    """
+    total_rank = n * (n + 1) // 2
+    out = np.empty((n, caps.shape[0]), dtype=np.int64)
+    for i in prange(n):
+        proportion = (n - i) / total_rank
+        for j in range(caps.shape[0]):
+            out[i, j] = np.int64(caps[j] * proportion * share)
+    return out
+
+
+@njit(parallel=True, cache=True)
+def scale_to_capacity(quantities, capacity):
+    """
+    Scale overallocated resource columns down to the available capacity
+
+    Args:
+        quantities: (zones, resources) float64 matrix of planned quantities
+                    (RESOURCE_KEYS columns in agents._constants)
+        capacity: float64 array of available quantities (inf = uncapped)
+
+    Returns:
+        (totals, scaled): planned totals per resource and the int64
+        quantities after scaling
+    """
+    n, r = quantities.shape
+    totals = np.zeros(r)
+    for i in range(n):
+        for j in range(r):
+            totals[j] += quantities[i, j]
+
+    scale = np.ones(r)
+    for j in range(r):
+        if totals[j] > capacity[j]:
+            scale[j] = capacity[j] / totals[j]
+
+    scaled = np.empty((n, r), dtype=np.int64)
+    for i in prange(n):
+        for j in range(r):
+            scaled[i, j] = np.int64(quantities[i, j] * scale[j])
+    return totals, scaled
@@ -0,0 +1,10 @@
+"""
+Shared constants for the agents and their numeric kernels
+"""
+
+# Resource types, in the column order used by the numeric kernels
+RESOURCE_KEYS = ('food_packages', 'water_liters', 'medical_kits',
+                 'shelter_materials', 'blankets', 'hygiene_kits')
+
+# Resources covered by the rank-proportional fallback allocation
+FALLBACK_KEYS = ('food_packages', 'water_liters', 'medical_kits', 'shelter_materials')
@@ -0,0 +1,198 @@
+"""
+Routing Core - Numeric kernels for fallback route planning and vehicle loading
+
+Great-circle distance matrices between the depot and zones, nearest
+neighbour tours improved with 2-opt, and per-vehicle cargo weights.
+"""
+import numpy as np
+from agents._constants import RESOURCE_KEYS
+from utils.jit import njit
+
+# Approximate weights (in kg) per unit of each resource type, in RESOURCE_KEYS order
+WEIGHTS = np.array([
+    0.5,   # food_packages, per package
+    1.0,   # water_liters, per liter
+    2.0,   # medical_kits, per kit
+    15.0,  # shelter_materials, per unit
+    1.5,   # blankets, per blanket
+    3.0    # hygiene_kits, per kit
+], dtype=np.float32)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+@njit(cache=True, fastmath=True)
+def nn_tour(dists):
+    """
+    Nearest-neighbor tour starting from the depot (index 0)
+    
+    Args:
+        dists: Square float32 distance matrix, depot first
+        
+    Returns:
+        int32 array of node indices in visiting order, starting with 0
+    """
+    n = dists.shape[0]
+    tour = np.zeros(n, dtype=np.int32)
+    visited = np.zeros(n, dtype=np.bool_)
+    visited[0] = True
+    current = 0
+    
+    for k in range(1, n):
+        best = -1
+        best_dist = np.inf
+        for j in range(n):
+            if not visited[j] and dists[current, j] < best_dist:
+                best = j
+                best_dist = dists[current, j]
+        tour[k] = best
+        visited[best] = True
+        current = best
+    
+    return tour
+
+
+@njit(fastmath=True, cache=True)
+def two_opt(tour, dists):
+    """
+    Improve a closed tour with 2-opt moves until no move shortens it
+    
+    Routes only have a handful of stops, so the scan runs serially;
+    starting threads would cost more than the loop itself.
+    
+    Args:
+        tour: int32 array of node indices, depot first
+        dists: Square float32 distance matrix
+        
+    Returns:
+        Improved tour (the depot stays at index 0)
+    """
+    tour = tour.copy()
+    n = tour.shape[0]
+    improved = True
+    
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            a = tour[i - 1]
+            b = tour[i]
+            
+            # Most negative change in length from reversing tour[i..j]
+            best = -1
+            best_gain = -1e-6
+            for j in range(i + 1, n):
+                c = tour[j]
+                d = tour[(j + 1) % n]
+                gain = dists[a, c] + dists[b, d] - dists[a, b] - dists[c, d]
+                if gain < best_gain:
+                    best = j
+                    best_gain = gain
+            
+            if best > 0:
+                lo, hi = i, best
+                while lo < hi:
+                    tour[lo], tour[hi] = tour[hi], tour[lo]
+                    lo += 1
+                    hi -= 1
+                improved = True
+    
+    return tour
+
+
+def route_distance_matrix(lats, lons, depot):
+    """
+    Depot-first matrix of great-circle distances (km) between zones
+    
+    Args:
+        lats, lons: Zone coordinates in degrees
+        depot: (latitude, longitude) of the distribution center
+    """
+    lat = np.radians(np.concatenate(([depot[0]], lats)))
+    lon = np.radians(np.concatenate(([depot[1]], lons)))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = (np.sin(dlat / 2) ** 2
+         + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2)
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).astype(np.float32)
+
+
+def tour_length(tour, dists):
+    """Length of the closed tour, including the return to the depot"""
+    return float(dists[tour, np.roll(tour, -1)].sum())
+
+
+def fallback_routes(allocations, zone_logistics, zones_per_route=3):
+    """
+    Group allocated zones into routes and order each route's stops
+    
+    Stops are ordered by their coordinates, with the depot at the
+    centroid of the allocated zones. The reported distance stays the sum
+    of the zones' distances from the depot: the simulated coordinates
+    and depot distances are drawn independently and don't share a scale.
+    
+    Args:
+        allocations: Resource allocations in priority order
+        zone_logistics: Zone logistics records with distance_from_depot,
+                        latitude and longitude
+        zones_per_route: Number of zones served by each vehicle
+        
+    Returns:
+        List of route dictionaries
+    """
+    routes = []
+    by_id = {zl['zone_id']: zl for zl in zone_logistics}
+    depot = (
+        float(np.mean([zl['latitude'] for zl in zone_logistics])) if zone_logistics else 0.0,
+        float(np.mean([zl['longitude'] for zl in zone_logistics])) if zone_logistics else 0.0,
+    )
+    
+    for i in range(0, len(allocations), zones_per_route):
+        route_zones = allocations[i:i + zones_per_route]
+        route_ids = [z['zone_id'] for z in route_zones]
+        # Zones without logistics data are placed at the depot
+        route_logistics = [by_id.get(zid, {}) for zid in route_ids]
+        
+        # Order the route's stops with a nearest-neighbor tour,
+        # then shorten it with 2-opt
+        dists = route_distance_matrix(
+            [zl.get('latitude', depot[0]) for zl in route_logistics],
+            [zl.get('longitude', depot[1]) for zl in route_logistics],
+            depot
+        )
+        tour = two_opt(nn_tour(dists), dists)
+        zone_ids = [route_ids[k - 1] for k in tour[1:]]
+        
+        # Calculate simple estimates
+        total_distance = sum(zl.get('distance_from_depot', 10) for zl in route_logistics)
+        
+        routes.append({
+            'route_id': len(routes) + 1,
+            'vehicle_number': len(routes) + 1,
+            'zones_sequence': zone_ids,
+            'total_distance_km': round(total_distance, 1),
+            'estimated_time_hours': round(total_distance / 30 + 2, 1),
+            'delivery_notes': 'Standard delivery route'
+        })
+    
+    return routes
+
+
+def loading_weights(route_allocations):
+    """
+    Weight of every allocated item and of each zone's load
+    
+    Args:
+        route_allocations: Resource allocations for the zones in a route
+        
+    Returns:
+        Tuple of (zones x resource types) item weights and per-zone totals, in kg
+    """
+    # Non-numeric or missing entries contribute no weight
+    quantities = np.array([
+        [alloc[key] if isinstance(alloc.get(key), (int, float)) else 0
+         for key in RESOURCE_KEYS]
+        for alloc in route_allocations
+    ], dtype=np.float32).reshape(-1, len(RESOURCE_KEYS))
+    
+    item_weights = quantities * WEIGHTS
+    return item_weights, item_weights.sum(axis=1)
@@ -3,54 +3,84 @@ Logistics Coordinator Agent - Plans optimal delivery routes and schedules
 """
 import json
 import os
+import pandas as pd
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.llm_wrapper import LocalLLM
+from core.llm_pool import get_llm
+from utils.llm_cache import cached_invoke, cached_ainvoke
+from utils.llm_parse import parse_llm_json
+from utils.llm_wrapper import LLM_ERRORS
+from utils.json_utils import to_json
+from agents._constants import RESOURCE_KEYS
+from agents._routing_core import fallback_routes, loading_weights
 
 load_dotenv()
 
+# Output token budget for the delivery plan
+PLAN_MAX_TOKENS = 1024
+
+# Shape of the delivery plan response
+DELIVERY_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "routes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "route_id": {"type": "integer"},
+                    "vehicle_number": {"type": "integer"},
+                    "zones_sequence": {"type": "array", "items": {"type": "string"}},
+                    "zone_names": {"type": "array", "items": {"type": "string"}},
+                    "total_distance_km": {"type": "number", "minimum": 0},
+                    "estimated_time_hours": {"type": "number", "minimum": 0},
+                    "road_conditions": {"type": "string"},
+                    "special_requirements": {"type": "string"},
+                    "delivery_notes": {"type": "string"}
+                },
+                "required": ["route_id", "vehicle_number", "zones_sequence",
+                             "total_distance_km", "estimated_time_hours"]
+            }
+        },
+        "total_vehicles_needed": {"type": "integer", "minimum": 0},
+        "total_delivery_time_hours": {"type": "number", "minimum": 0},
+        "estimated_completion": {"type": "string"},
+        "logistics_summary": {"type": "string"},
+        "potential_challenges": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["routes", "total_vehicles_needed", "total_delivery_time_hours",
+                 "estimated_completion"]
+}
+
 
 class LogisticsCoordinatorAgent:
     """Agent responsible for delivery route optimization and scheduling"""
     
-    def __init__(self, temperature=0.3):
+    def __init__(self, temperature=0.0, group='reasoning', quantization=None, llm=None):
         """
         Initialize logistics coordinator agent
         
         Args:
-            temperature: LLM temperature for planning
-        """
-        self.llm = LocalLLM(temperature=temperature)
-    
-    def plan_delivery_routes(self, allocations, zones_df):
-        """
-        Plan optimal delivery routes for allocated resources
-        
-        Args:
-            allocations: List of resource allocations per zone
-            zones_df: DataFrame with zone logistics information
-            
-        Returns:
-            Dictionary with delivery routes and schedule
+            temperature: LLM temperature for planning (0 for deterministic JSON output)
+            group: Model group to use when LLM_ENDPOINTS defines several backends
+            quantization: Model precision ('fp16', 'int8', 'int4'; None = default tag)
+            llm: LLM client to use instead of the shared one for group/quantization
         """
-        print(f"\n🚚 Planning delivery logistics for {len(allocations)} zones...")
+        self.llm = llm or get_llm(group, quantization)
+        self.temperature = temperature
         
-        # Extract relevant logistics data for allocated zones
-        allocated_zone_ids = [alloc['zone_id'] for alloc in allocations]
-        zone_logistics = zones_df[zones_df['zone_id'].isin(allocated_zone_ids)][
-            ['zone_id', 'zone_name', 'distance_from_depot', 'road_condition', 
-             'accessibility', 'security_level', 'population']
-        ].to_dict('records')
-        
-        prompt = f"""You are an expert logistics coordinator for humanitarian aid operations.
+        # Static prompt sections, built once and reused for every plan
+        self._prompt_prefix = """You are an expert logistics coordinator for humanitarian aid operations.
 Plan efficient delivery routes considering real-world constraints.
 
 RESOURCE ALLOCATIONS TO DELIVER:
-{json.dumps(allocations, indent=2)}
+"""
+        self._prompt_middle = """
 
 ZONE LOGISTICS DATA:
-{json.dumps(zone_logistics, indent=2)}
+"""
+        self._prompt_suffix = """
 
 LOGISTICS CONSTRAINTS:
 - Each vehicle can carry approximately 3000 kg of mixed supplies
@@ -69,9 +99,9 @@ ROUTE PLANNING OBJECTIVES:
 5. Ensure security protocols for risk zones
 
 Return ONLY valid JSON in this exact format:
-{{
+{
   "routes": [
-    {{
+    {
       "route_id": 1,
       "vehicle_number": 1,
       "zones_sequence": ["Z01", "Z03"],
@@ -81,20 +111,84 @@ Return ONLY valid JSON in this exact format:
       "road_conditions": "mostly good, some fair",
       "special_requirements": "security escort for Z03",
       "delivery_notes": "Priority route - serve highest need zones first"
-    }}
+    }
   ],
   "total_vehicles_needed": 2,
   "total_delivery_time_hours": 8.5,
   "estimated_completion": "Day 1",
   "logistics_summary": "Brief overview of logistics plan",
   "potential_challenges": ["challenge1", "challenge2"]
-}}
+}
 
 Do not include any text before or after the JSON."""
-
+    
+    def plan_delivery_routes(self, allocations, zones_df):
+        """
+        Plan optimal delivery routes for allocated resources
+        
+        Args:
+            allocations: List of resource allocations per zone
+            zones_df: DataFrame with zone logistics information (rows are
+                      looked up by a zone_id index, added if missing)
+            
+        Returns:
+            Dictionary with delivery routes and schedule
+        """
+        print(f"\n🚚 Planning delivery logistics for {len(allocations)} zones...")
+        
+        prompt, zone_logistics = self._route_prompt(allocations, zones_df)
+        try:
+            response = cached_invoke(
+                self.llm, prompt,
+                temperature=self.temperature, max_tokens=PLAN_MAX_TOKENS, schema=DELIVERY_PLAN_SCHEMA
+            )
+        except LLM_ERRORS as e:
+            print(f"⚠️  {e}")
+            return self._create_fallback_route_plan(allocations, zone_logistics)
+        return self._parse_delivery_plan(response, allocations, zone_logistics)
+    
+    async def plan_delivery_routes_async(self, allocations, zones_df):
+        """Async counterpart of plan_delivery_routes()"""
+        print(f"\n🚚 Planning delivery logistics for {len(allocations)} zones...")
+        
+        prompt, zone_logistics = self._route_prompt(allocations, zones_df)
         try:
-            response = self.llm.invoke(prompt)
-            delivery_plan = json.loads(response.content)
+            response = await cached_ainvoke(
+                self.llm, prompt,
+                temperature=self.temperature, max_tokens=PLAN_MAX_TOKENS, schema=DELIVERY_PLAN_SCHEMA
+            )
+        except LLM_ERRORS as e:
+            print(f"⚠️  {e}")
+            return self._create_fallback_route_plan(allocations, zone_logistics)
+        return self._parse_delivery_plan(response, allocations, zone_logistics)
+    
+    def _route_prompt(self, allocations, zones_df):
+        """Build the routing prompt; also returns the zone logistics it embeds"""
+        # SettlementSimulator.zones is indexed by zone_id; other frames
+        # (e.g. with a RangeIndex) are indexed on their zone_id column here
+        if not zones_df.index.equals(pd.Index(zones_df['zone_id'])):
+            zones_df = zones_df.set_index('zone_id', drop=False)
+        
+        # Extract relevant logistics data for allocated zones
+        allocated_zone_ids = [
+            zone_id for zone_id in dict.fromkeys(alloc['zone_id'] for alloc in allocations)
+            if zone_id in zones_df.index
+        ]
+        zone_logistics = zones_df.loc[
+            allocated_zone_ids,
+            ['zone_id', 'zone_name', 'distance_from_depot', 'road_condition', 
+             'accessibility', 'security_level', 'population', 'latitude', 'longitude']
+        ].to_dict('records')
+        
+        prompt = (self._prompt_prefix + to_json(allocations)
+                  + self._prompt_middle + to_json(zone_logistics)
+                  + self._prompt_suffix)
+        return prompt, zone_logistics
+    
+    def _parse_delivery_plan(self, response, allocations, zone_logistics):
+        """Parse the routing response, falling back to heuristic routes"""
+        try:
+            delivery_plan = parse_llm_json(response.content)
             
             print(f"✓ Created {len(delivery_plan['routes'])} delivery routes")
             print(f"  Total vehicles needed: {delivery_plan['total_vehicles_needed']}")
@@ -111,29 +205,7 @@ Do not include any text before or after the JSON."""
         """Create simple route plan if AI fails"""
         print("⚠️  Using fallback route planning...")
         
-        routes = []
-        zones_per_route = 3  # Simple grouping
-        
-        for i in range(0, len(allocations), zones_per_route):
-            route_zones = allocations[i:i + zones_per_route]
-            zone_ids = [z['zone_id'] for z in route_zones]
-            
-            # Calculate simple estimates
-            total_distance = sum(
-                next((zl['distance_from_depot'] for zl in zone_logistics 
-                      if zl['zone_id'] == zid), 10)
-                for zid in zone_ids
-            )
-            
-            route = {
-                'route_id': len(routes) + 1,
-                'vehicle_number': len(routes) + 1,
-                'zones_sequence': zone_ids,
-                'total_distance_km': round(total_distance, 1),
-                'estimated_time_hours': round(total_distance / 30 + 2, 1),
-                'delivery_notes': 'Standard delivery route'
-            }
-            routes.append(route)
+        routes = fallback_routes(allocations, zone_logistics)
         
         return {
             'routes': routes,
@@ -158,38 +230,25 @@ Do not include any text before or after the JSON."""
         route_zones = route['zones_sequence']
         route_allocations = [a for a in allocations if a['zone_id'] in route_zones]
         
-        # Approximate weights (in kg)
-        weights = {
-            'food_packages': 0.5,      # per package
-            'water_liters': 1.0,       # per liter
-            'medical_kits': 2.0,       # per kit
-            'shelter_materials': 15.0, # per unit
-            'blankets': 1.5,           # per blanket
-            'hygiene_kits': 3.0        # per kit
-        }
+        item_weights, zone_weights = loading_weights(route_allocations)
+        total_weight = float(zone_weights.sum())
         
         loading_plan = []
-        total_weight = 0
-        
-        for alloc in route_allocations:
-            zone_weight = 0
-            zone_items = {}
-            
-            for resource_type, quantity in alloc.items():
-                if resource_type in weights and isinstance(quantity, (int, float)):
-                    item_weight = quantity * weights[resource_type]
-                    zone_weight += item_weight
-                    zone_items[resource_type] = {
-                        'quantity': quantity,
-                        'weight_kg': round(item_weight, 1)
-                    }
+        for i, alloc in enumerate(route_allocations):
+            zone_items = {
+                resource_type: {
+                    'quantity': alloc[resource_type],
+                    'weight_kg': round(float(item_weights[i, j]), 1)
+                }
+                for j, resource_type in enumerate(RESOURCE_KEYS)
+                if isinstance(alloc.get(resource_type), (int, float))
+            }
             
-            total_weight += zone_weight
             loading_plan.append({
                 'zone_id': alloc['zone_id'],
                 'zone_name': alloc.get('zone_name', 'Unknown'),
                 'items': zone_items,
-                'total_weight_kg': round(zone_weight, 1)
+                'total_weight_kg': round(float(zone_weights[i]), 1)
             })
         
         return {
@@ -202,33 +261,39 @@ Do not include any text before or after the JSON."""
     
     def generate_delivery_schedule(self, delivery_plan):
         """Generate detailed time-based delivery schedule"""
+        def fmt(t):
+            """Format fractional hours as HH:MM"""
+            h = int(t)
+            return f"{h:02d}:{int((t - h) * 60):02d}"
+        
         schedule = []
         current_time = 8.0  # Start at 8:00 AM
         
         for route in delivery_plan['routes']:
             route_schedule = {
                 'route_id': route['route_id'],
-                'start_time': f"{int(current_time):02d}:{int((current_time % 1) * 60):02d}",
+                'start_time': fmt(current_time),
                 'zones': [],
                 'end_time': None
             }
             
             time_offset = 0
             for i, zone_id in enumerate(route['zones_sequence']):
-                zone_time = current_time + time_offset
+                arrival = current_time + time_offset
+                departure = arrival + 0.5
                 
                 zone_schedule = {
                     'sequence': i + 1,
                     'zone_id': zone_id,
-                    'arrival_time': f"{int(zone_time):02d}:{int((zone_time % 1) * 60):02d}",
+                    'arrival_time': fmt(arrival),
                     'unloading_duration_minutes': 30,
-                    'departure_time': f"{int(zone_time + 0.5):02d}:{int(((zone_time + 0.5) % 1) * 60):02d}"
+                    'departure_time': fmt(departure)
                 }
                 
                 route_schedule['zones'].append(zone_schedule)
                 time_offset += 1.0  # 1 hour per zone (travel + unload)
             
-            route_schedule['end_time'] = f"{int(current_time + time_offset):02d}:{int(((current_time + time_offset) % 1) * 60):02d}"
+            route_schedule['end_time'] = fmt(current_time + time_offset)
             schedule.append(route_schedule)
             
             current_time += time_offset + 0.5  # Add buffer between routes
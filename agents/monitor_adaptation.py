@@ -3,70 +3,101 @@ Monitor & Adaptation Agent - Tracks outcomes and suggests improvements
 """
 import json
 import os
+from collections import Counter
+from operator import itemgetter
+import numpy as np
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.llm_wrapper import LocalLLM
+from core.llm_pool import get_llm
+from utils.llm_cache import cached_invoke
+from utils.llm_parse import parse_llm_json
+from utils.llm_wrapper import LLM_ERRORS
+from utils.json_utils import to_json
 
 load_dotenv()
 
+_ZONE_IDS = {"type": "array", "items": {"type": "string"}}
+
+# Output token budget for the outcome analysis
+ANALYSIS_MAX_TOKENS = 1024
+
+# Shape of the outcome analysis response
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_success_rate": {"type": "number", "minimum": 0, "maximum": 100},
+        "zones_fully_served": _ZONE_IDS,
+        "zones_partially_served": _ZONE_IDS,
+        "zones_requiring_followup": _ZONE_IDS,
+        "critical_gaps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "zone_id": {"type": "string"},
+                    "gap_description": {"type": "string"},
+                    "urgency": {"type": "string"},
+                    "recommended_action": {"type": "string"}
+                }
+            }
+        },
+        "challenges_identified": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "challenge_type": {"type": "string"},
+                    "zones_affected": {"type": "integer"},
+                    "impact": {"type": "string"},
+                    "mitigation": {"type": "string"}
+                }
+            }
+        },
+        "performance_insights": {"type": "string"},
+        "recommendations_next_cycle": {"type": "array", "items": {"type": "string"}},
+        "priority_adjustments": {"type": "string"},
+        "resource_reallocation_needed": {
+            "type": "object",
+            "properties": {
+                "zones": _ZONE_IDS,
+                "resources_needed": {"type": "object"},
+                "reason": {"type": "string"}
+            }
+        }
+    },
+    "required": ["overall_success_rate", "zones_fully_served", "zones_partially_served",
+                 "zones_requiring_followup", "recommendations_next_cycle"]
+}
+
+
+def _delivered_percentages(outcomes):
+    """Delivered percentage of each outcome as a float32 array"""
+    return np.fromiter(
+        (o['delivered_percentage'] for o in outcomes),
+        dtype=np.float32,
+        count=len(outcomes)
+    )
+
 
 class MonitorAdaptationAgent:
     """Agent responsible for monitoring delivery outcomes and adaptive learning"""
     
-    def __init__(self, temperature=0.4):
+    def __init__(self, temperature=0.0, group='fast', quantization=None, llm=None):
         """
         Initialize monitor and adaptation agent
         
         Args:
-            temperature: LLM temperature (slightly higher for recommendations)
-        """
-        self.llm = LocalLLM(temperature=temperature)
-    
-    def analyze_delivery_outcomes(self, delivery_plan, actual_outcomes, allocations):
+            temperature: LLM temperature (0 for deterministic JSON output)
+            group: Model group to use when LLM_ENDPOINTS defines several backends
+            quantization: Model precision ('fp16', 'int8', 'int4'; None = default tag)
+            llm: LLM client to use instead of the shared one for group/quantization
         """
-        Analyze delivery outcomes and identify gaps
+        self.llm = llm or get_llm(group, quantization)
+        self.temperature = temperature
         
-        Args:
-            delivery_plan: Planned delivery routes and schedule
-            actual_outcomes: Actual delivery results (simulated or real)
-            allocations: Original resource allocations
-            
-        Returns:
-            Analysis with recommendations
-        """
-        print(f"\n📊 Analyzing delivery outcomes for {len(actual_outcomes)} zones...")
-        
-        # Calculate success metrics
-        fully_delivered = [o for o in actual_outcomes if o['delivered_percentage'] >= 95]
-        partially_delivered = [o for o in actual_outcomes if 75 <= o['delivered_percentage'] < 95]
-        under_delivered = [o for o in actual_outcomes if o['delivered_percentage'] < 75]
-        
-        # Identify challenges
-        challenges_encountered = {}
-        for outcome in actual_outcomes:
-            challenge = outcome.get('challenges', 'none')
-            if challenge != 'none':
-                challenges_encountered[challenge] = challenges_encountered.get(challenge, 0) + 1
-        
-        prompt = f"""You are a humanitarian operations monitoring and evaluation specialist.
-Analyze delivery outcomes and provide actionable recommendations for improvement.
-
-PLANNED DELIVERY:
-- Routes planned: {len(delivery_plan.get('routes', []))}
-- Zones targeted: {len(allocations)}
-- Total delivery time planned: {delivery_plan.get('total_delivery_time_hours', 0)} hours
-
-ACTUAL OUTCOMES:
-{json.dumps(actual_outcomes, indent=2)}
-
-PERFORMANCE METRICS:
-- Fully delivered (≥95%): {len(fully_delivered)} zones
-- Partially delivered (75-94%): {len(partially_delivered)} zones
-- Under-delivered (<75%): {len(under_delivered)} zones
-
-CHALLENGES ENCOUNTERED:
-{json.dumps(challenges_encountered, indent=2)}
+        # Static analysis instructions, built once and reused for every cycle
+        self._prompt_suffix = """
 
 ANALYSIS REQUIRED:
 1. Calculate overall success rate and identify bottlenecks
@@ -76,26 +107,26 @@ ANALYSIS REQUIRED:
 5. Suggest priority adjustments based on actual outcomes
 
 Return ONLY valid JSON in this exact format:
-{{
+{
   "overall_success_rate": 85.5,
   "zones_fully_served": ["Z01", "Z02"],
   "zones_partially_served": ["Z03"],
   "zones_requiring_followup": ["Z04"],
   "critical_gaps": [
-    {{
+    {
       "zone_id": "Z04",
       "gap_description": "Only 60% delivered due to road conditions",
       "urgency": "high",
       "recommended_action": "Arrange helicopter delivery or wait for road repair"
-    }}
+    }
   ],
   "challenges_identified": [
-    {{
+    {
       "challenge_type": "weather_delay",
       "zones_affected": 2,
       "impact": "Added 2 hours to delivery time",
       "mitigation": "Start deliveries earlier in the day"
-    }}
+    }
   ],
   "performance_insights": "Brief analysis of what went well and what didn't",
   "recommendations_next_cycle": [
@@ -104,40 +135,97 @@ Return ONLY valid JSON in this exact format:
     "recommendation 3"
   ],
   "priority_adjustments": "Suggested changes to zone priorities for next cycle",
-  "resource_reallocation_needed": {{
+  "resource_reallocation_needed": {
     "zones": ["Z04"],
-    "resources_needed": {{"food_packages": 500, "water_liters": 2000}},
+    "resources_needed": {"food_packages": 500, "water_liters": 2000},
     "reason": "Shortfall from partial delivery"
-  }}
-}}
+  }
+}
 
 Do not include any text before or after the JSON."""
+    
+    def analyze_delivery_outcomes(self, delivery_plan, actual_outcomes, allocations):
+        """
+        Analyze delivery outcomes and identify gaps
+        
+        Args:
+            delivery_plan: Planned delivery routes and schedule
+            actual_outcomes: Actual delivery results (simulated or real)
+            allocations: Original resource allocations
+            
+        Returns:
+            Analysis with recommendations
+        """
+        print(f"\n📊 Analyzing delivery outcomes for {len(actual_outcomes)} zones...")
+        
+        # Calculate success metrics
+        pct = _delivered_percentages(actual_outcomes)
+        fully_delivered = pct >= 95
+        partially_delivered = (pct >= 75) & (pct < 95)
+        under_delivered = pct < 75
+        
+        # Identify challenges
+        challenges_encountered = dict(Counter(
+            challenge
+            for challenge in (o.get('challenges', 'none') for o in actual_outcomes)
+            if challenge != 'none'
+        ))
+        
+        prompt = f"""You are a humanitarian operations monitoring and evaluation specialist.
+Analyze delivery outcomes and provide actionable recommendations for improvement.
+
+PLANNED DELIVERY:
+- Routes planned: {len(delivery_plan.get('routes', []))}
+- Zones targeted: {len(allocations)}
+- Total delivery time planned: {delivery_plan.get('total_delivery_time_hours', 0)} hours
+
+ACTUAL OUTCOMES:
+{to_json(actual_outcomes)}
+
+PERFORMANCE METRICS:
+- Fully delivered (≥95%): {int(fully_delivered.sum())} zones
+- Partially delivered (75-94%): {int(partially_delivered.sum())} zones
+- Under-delivered (<75%): {int(under_delivered.sum())} zones
+
+CHALLENGES ENCOUNTERED:
+{to_json(challenges_encountered)}"""
+        prompt += self._prompt_suffix
 
         try:
-            response = self.llm.invoke(prompt)
-            analysis = json.loads(response.content)
-            
-            print(f"✓ Analysis complete")
-            print(f"  Success Rate: {analysis['overall_success_rate']:.1f}%")
-            print(f"  Zones Fully Served: {len(analysis['zones_fully_served'])}")
-            print(f"  Follow-up Required: {len(analysis['zones_requiring_followup'])}")
-            
-            return analysis
-            
+            response = cached_invoke(
+                self.llm, prompt,
+                temperature=self.temperature, max_tokens=ANALYSIS_MAX_TOKENS, schema=ANALYSIS_SCHEMA
+            )
+        except LLM_ERRORS as e:
+            print(f"⚠️  {e}")
+            return self._create_fallback_analysis(actual_outcomes, allocations)
+        
+        try:
+            analysis = parse_llm_json(response.content)
         except json.JSONDecodeError as e:
             print(f"JSON decode error: {e}")
             print(f"Response was: {response.content}")
             return self._create_fallback_analysis(actual_outcomes, allocations)
+        
+        print(f"✓ Analysis complete")
+        print(f"  Success Rate: {analysis['overall_success_rate']:.1f}%")
+        print(f"  Zones Fully Served: {len(analysis['zones_fully_served'])}")
+        print(f"  Follow-up Required: {len(analysis['zones_requiring_followup'])}")
+        
+        return analysis
     
     def _create_fallback_analysis(self, actual_outcomes, allocations):
         """Create basic analysis if AI fails"""
         print("⚠️  Using fallback analysis...")
         
-        fully_served = [o['zone_id'] for o in actual_outcomes if o['delivered_percentage'] >= 95]
-        partially_served = [o['zone_id'] for o in actual_outcomes if 75 <= o['delivered_percentage'] < 95]
-        followup_needed = [o['zone_id'] for o in actual_outcomes if o['delivered_percentage'] < 75]
+        pct = _delivered_percentages(actual_outcomes)
+        zone_ids = [o['zone_id'] for o in actual_outcomes]
         
-        avg_delivery = sum(o['delivered_percentage'] for o in actual_outcomes) / len(actual_outcomes)
+        fully_served = [zone_ids[i] for i in np.flatnonzero(pct >= 95)]
+        partially_served = [zone_ids[i] for i in np.flatnonzero((pct >= 75) & (pct < 95))]
+        followup_needed = [zone_ids[i] for i in np.flatnonzero(pct < 75)]
+        
+        avg_delivery = float(pct.mean())
         
         return {
             'overall_success_rate': round(avg_delivery, 1),
@@ -173,8 +261,14 @@ Do not include any text before or after the JSON."""
                 'message': 'No historical data available yet'
             }
         
-        current_rate = current_cycle.get('overall_success_rate', 0)
-        previous_rates = [c.get('overall_success_rate', 0) for c in previous_cycles]
+        # Normalize once so the key lookups below can use itemgetter
+        cycles = previous_cycles + [current_cycle]
+        for cycle in cycles:
+            cycle.setdefault('overall_success_rate', 0)
+        success_rate = itemgetter('overall_success_rate')
+        
+        current_rate = success_rate(current_cycle)
+        previous_rates = [success_rate(c) for c in previous_cycles]
         avg_previous = sum(previous_rates) / len(previous_rates)
         
         improvement = current_rate - avg_previous
@@ -185,8 +279,7 @@ Do not include any text before or after the JSON."""
             'improvement_percentage': round(improvement, 1),
             'trend': 'improving' if improvement > 5 else 'declining' if improvement < -5 else 'stable',
             'total_cycles_completed': len(previous_cycles) + 1,
-            'best_performing_cycle': max(previous_cycles + [current_cycle], 
-                                        key=lambda x: x.get('overall_success_rate', 0))
+            'best_performing_cycle': max(cycles, key=success_rate)
         }
         
         return trend_analysis
@@ -3,41 +3,85 @@ Needs Assessment Agent - Analyzes settlement zones and prioritizes needs
 """
 import json
 import os
+import numpy as np
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from operator import itemgetter
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.llm_wrapper import LocalLLM
+from core.llm_pool import get_llm
+from utils.llm_cache import cached_invoke, cached_ainvoke, cached_batch_ainvoke
+from utils.llm_parse import parse_llm_json
+from utils.llm_wrapper import LLM_ERRORS
+from utils.json_utils import to_json
 
 load_dotenv()
 
+# Zone fields the assessment criteria are scored on; batch prompts send only these
+NUMERIC_COLS = (
+    'population', 'children_ratio', 'elderly_ratio', 'pregnant_women',
+    'chronic_illness_cases', 'food_shortage', 'water_shortage', 'medical_severity',
+    'shelter_damage', 'sanitation_need', 'last_aid_received_days',
+)
+
+_ASSESSMENT_PROPERTIES = {
+    "priority_score": {"type": "number", "minimum": 0, "maximum": 100},
+    "critical_needs": {"type": "array", "items": {"type": "string"}},
+    "vulnerability_score": {"type": "number", "minimum": 0, "maximum": 25},
+    "shortage_score": {"type": "number", "minimum": 0, "maximum": 35},
+    "time_score": {"type": "number", "minimum": 0, "maximum": 20},
+    "reasoning": {"type": "string"}
+}
+
+# Shapes of the single-zone and batched responses
+ZONE_ASSESSMENT_SCHEMA = {
+    "type": "object",
+    "properties": _ASSESSMENT_PROPERTIES,
+    "required": ["priority_score", "critical_needs", "reasoning"]
+}
+
+BATCH_ASSESSMENT_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"zone_id": {"type": "string"}, **_ASSESSMENT_PROPERTIES},
+        "required": ["zone_id", "priority_score", "critical_needs", "reasoning"]
+    }
+}
+
+# Output token budget per zone assessment; a few scores plus a short
+# reasoning comfortably fit, and decoding time scales with the cap
+ZONE_MAX_TOKENS = 256
+
 
 class NeedsAssessmentAgent:
     """Agent responsible for assessing humanitarian needs and setting priorities"""
     
-    def __init__(self, temperature=0.3):
+    def __init__(self, temperature=0.0, max_workers=8, group='fast', quantization=None, llm=None):
         """
         Initialize the needs assessment agent
         
         Args:
-            temperature: LLM temperature for responses
-        """
-        self.llm = LocalLLM(temperature=temperature)
-        
-    def assess_zone_priority(self, zone_data):
+            temperature: LLM temperature (0 for deterministic JSON output)
+            max_workers: Maximum number of concurrent zone assessments
+                         (threads, or in-flight requests on the async path)
+            group: Model group to use when LLM_ENDPOINTS defines several backends
+            quantization: Model precision ('fp16', 'int8', 'int4'; None = default tag)
+            llm: LLM client to use instead of the shared one for group/quantization
         """
-        Assess priority score for a single zone
+        self.llm = llm or get_llm(group, quantization)
+        self.temperature = temperature
+        self.max_workers = max_workers
         
-        Args:
-            zone_data: Dictionary containing zone information
-            
-        Returns:
-            Dictionary with priority score, critical needs, and reasoning
-        """
-        prompt = f"""You are an expert humanitarian needs assessment specialist working for the UN. 
+        # Static prompt sections, built once and reused for every zone
+        self._prompt_prefix = """You are an expert humanitarian needs assessment specialist working for the UN. 
 Analyze this refugee settlement zone and calculate a priority score from 0-100 (100 = most urgent).
 
 ZONE DATA:
-{json.dumps(zone_data, indent=2)}
+"""
+        self._prompt_suffix = """
 
 ASSESSMENT CRITERIA:
 1. Vulnerable populations (children, elderly, pregnant women, chronic illness) - 25 points
@@ -47,37 +91,164 @@ ASSESSMENT CRITERIA:
 5. Shelter and sanitation conditions - 10 points
 
 IMPORTANT: Return ONLY valid JSON in this exact format:
-{{
+{
   "priority_score": <number between 0-100>,
   "critical_needs": ["need1", "need2", "need3"],
   "vulnerability_score": <number 0-25>,
   "shortage_score": <number 0-35>,
   "time_score": <number 0-20>,
   "reasoning": "2-3 sentence explanation of priority level"
-}}
+}
 
 Do not include any text before or after the JSON."""
+        self._batch_prompt_prefix = """You are an expert humanitarian needs assessment specialist working for the UN. 
+Analyze each refugee settlement zone below and calculate a priority score from 0-100 (100 = most urgent).
+
+ZONES DATA:
+"""
+        self._batch_prompt_suffix = """
 
+ASSESSMENT CRITERIA:
+1. Vulnerable populations (children, elderly, pregnant women, chronic illness) - 25 points
+2. Critical shortages (food, water, medical) - 35 points  
+3. Time since last aid received - 20 points
+4. Population size and density - 10 points
+5. Shelter and sanitation conditions - 10 points
+
+IMPORTANT: Return ONLY a JSON array with one object per input zone:
+[
+  {
+    "zone_id": "<zone_id from the input>",
+    "priority_score": <number between 0-100>,
+    "critical_needs": ["need1", "need2", "need3"],
+    "vulnerability_score": <number 0-25>,
+    "shortage_score": <number 0-35>,
+    "time_score": <number 0-20>,
+    "reasoning": "2-3 sentence explanation of priority level"
+  }
+]
+
+Do not include any text before or after the JSON array."""
+        
+    def assess_zone_priority(self, zone_data):
+        """
+        Assess priority score for a single zone
+        
+        Args:
+            zone_data: Dictionary containing zone information
+            
+        Returns:
+            Dictionary with priority score, critical needs, and reasoning
+        """
+        response = cached_invoke(
+            self.llm, self._zone_prompt(zone_data),
+            temperature=self.temperature, max_tokens=ZONE_MAX_TOKENS, schema=ZONE_ASSESSMENT_SCHEMA
+        )
+        return self._parse_zone_assessment(zone_data, response)
+    
+    async def assess_zone_priority_async(self, zone_data):
+        """Async counterpart of assess_zone_priority()"""
+        response = await cached_ainvoke(
+            self.llm, self._zone_prompt(zone_data),
+            temperature=self.temperature, max_tokens=ZONE_MAX_TOKENS, schema=ZONE_ASSESSMENT_SCHEMA
+        )
+        return self._parse_zone_assessment(zone_data, response)
+    
+    def _zone_prompt(self, zone_data):
+        """Full single-zone assessment prompt"""
+        return self._prompt_prefix + to_json(zone_data) + self._prompt_suffix
+    
+    def _parse_zone_assessment(self, zone_data, response):
+        """Turn a single-zone response into an assessment dict"""
         try:
-            response = self.llm.invoke(prompt)
-            result = json.loads(response.content)
+            result = parse_llm_json(response.content)
             result['zone_id'] = zone_data.get('zone_id', 'Unknown')
             result['zone_name'] = zone_data.get('zone_name', 'Unknown')
             return result
         except json.JSONDecodeError as e:
             print(f"JSON decode error for zone {zone_data.get('zone_id')}: {e}")
             print(f"Response was: {response.content}")
-            # Return default assessment
-            return {
-                'zone_id': zone_data.get('zone_id', 'Unknown'),
-                'zone_name': zone_data.get('zone_name', 'Unknown'),
-                'priority_score': 50,
-                'critical_needs': ['food', 'water'],
-                'vulnerability_score': 12,
-                'shortage_score': 18,
-                'time_score': 10,
-                'reasoning': 'Default assessment due to processing error'
-            }
+            return self._default_assessment(zone_data)
+    
+    @staticmethod
+    def _default_assessment(zone_data):
+        """Neutral assessment for a zone the LLM couldn't assess"""
+        return {
+            'zone_id': zone_data.get('zone_id', 'Unknown'),
+            'zone_name': zone_data.get('zone_name', 'Unknown'),
+            'priority_score': 50,
+            'critical_needs': ['food', 'water'],
+            'vulnerability_score': 12,
+            'shortage_score': 18,
+            'time_score': 10,
+            'reasoning': 'Default assessment due to processing error'
+        }
+    
+    def assess_zones_batch(self, zones_list):
+        """
+        Assess several zones with a single LLM request
+        
+        Args:
+            zones_list: List of zone dictionaries
+            
+        Returns:
+            List of assessments in input order, or None if any input zone
+            is missing from the response
+        """
+        response = cached_invoke(
+            self.llm, self._batch_prompt(zones_list),
+            temperature=self.temperature, max_tokens=ZONE_MAX_TOKENS * len(zones_list),
+            schema=BATCH_ASSESSMENT_SCHEMA
+        )
+        return self._parse_batch(zones_list, response)
+    
+    async def assess_zones_batch_async(self, zones_list):
+        """Async counterpart of assess_zones_batch()"""
+        response = await cached_ainvoke(
+            self.llm, self._batch_prompt(zones_list),
+            temperature=self.temperature, max_tokens=ZONE_MAX_TOKENS * len(zones_list),
+            schema=BATCH_ASSESSMENT_SCHEMA
+        )
+        return self._parse_batch(zones_list, response)
+    
+    def _batch_prompt(self, zones_list):
+        """Full multi-zone assessment prompt, limited to the scored fields"""
+        zones_data = [
+            {'zone_id': zone['zone_id'], **{col: zone[col] for col in NUMERIC_COLS if col in zone}}
+            for zone in zones_list
+        ]
+        return self._batch_prompt_prefix + to_json(zones_data) + self._batch_prompt_suffix
+    
+    def _parse_batch(self, zones_list, response):
+        """Match a batched response to the input zones, or None if it can't be"""
+        try:
+            results = parse_llm_json(response.content)
+        except json.JSONDecodeError as e:
+            print(f"JSON decode error for batch assessment: {e}")
+            return None
+        
+        if not isinstance(results, list):
+            print("⚠️  Batch assessment did not return a JSON array")
+            return None
+        
+        # Join on zone_id so the model is free to reorder its answers
+        by_id = {
+            str(result.get('zone_id')): result
+            for result in results
+            if isinstance(result, dict) and 'priority_score' in result
+        }
+        
+        assessments = []
+        for zone_data in zones_list:
+            result = by_id.get(str(zone_data.get('zone_id')))
+            if result is None:
+                print(f"⚠️  Missing batch assessment for zone {zone_data.get('zone_id')}")
+                return None
+            result['zone_id'] = zone_data.get('zone_id', 'Unknown')
+            result['zone_name'] = zone_data.get('zone_name', 'Unknown')
+            assessments.append(result)
+        
+        return assessments
     
     def assess_all_zones(self, zones_df):
         """
@@ -91,20 +262,63 @@ Do not include any text before or after the JSON."""
         """
         print(f"\n🔍 Assessing needs for {len(zones_df)} zones...")
         
-        assessments = []
-        for idx, zone in zones_df.iterrows():
-            zone_dict = zone.to_dict()
-            assessment = self.assess_zone_priority(zone_dict)
-            assessments.append(assessment)
-            
-            # Progress indicator
-            if (idx + 1) % 3 == 0 or (idx + 1) == len(zones_df):
-                print(f"   Assessed {idx + 1}/{len(zones_df)} zones...")
+        records = zones_df.to_dict('records')
+        
+        # One request for every zone; only fall back to per-zone calls
+        # when the batched response can't be used
+        try:
+            assessments = self.assess_zones_batch(records)
+            if assessments is None:
+                print("⚠️  Falling back to per-zone assessment...")
+                assessments = self._assess_zones_individually(records)
+            else:
+                print(f"   Assessed {len(records)}/{len(records)} zones...")
+        except LLM_ERRORS as e:
+            assessments = self._default_assessments(records, e)
+        
+        return self._prioritize(assessments)
+    
+    async def assess_all_zones_async(self, zones_df):
+        """
+        Async counterpart of assess_all_zones(); the per-zone fallback goes
+        out as one batch_invoke() (up to max_workers requests at once, or a
+        single list request on vLLM) instead of through a thread pool
+        """
+        print(f"\n🔍 Assessing needs for {len(zones_df)} zones...")
+        
+        records = zones_df.to_dict('records')
+        
+        try:
+            assessments = await self.assess_zones_batch_async(records)
+            if assessments is None:
+                print("⚠️  Falling back to per-zone assessment...")
+                # One concurrent batch, bounded so the server isn't flooded
+                responses = await cached_batch_ainvoke(
+                    self.llm, [self._zone_prompt(record) for record in records],
+                    max_concurrency=self.max_workers,
+                    temperature=self.temperature, max_tokens=ZONE_MAX_TOKENS, schema=ZONE_ASSESSMENT_SCHEMA
+                )
+                assessments = [
+                    self._parse_zone_assessment(record, response)
+                    for record, response in zip(records, responses)
+                ]
+            print(f"   Assessed {len(records)}/{len(records)} zones...")
+        except LLM_ERRORS as e:
+            assessments = self._default_assessments(records, e)
         
-        # Sort by priority score (descending)
+        return self._prioritize(assessments)
+    
+    def _default_assessments(self, records, error):
+        """Default assessment for every zone while the LLM backend is unavailable"""
+        print(f"⚠️  {error}")
+        print("⚠️  Using default assessments...")
+        return [self._default_assessment(record) for record in records]
+    
+    def _prioritize(self, assessments):
+        """Sort assessments by priority score (descending)"""
         sorted_assessments = sorted(
             assessments, 
-            key=lambda x: x['priority_score'], 
+            key=itemgetter('priority_score'), 
             reverse=True
         )
         
@@ -113,6 +327,26 @@ Do not include any text before or after the JSON."""
         
         return sorted_assessments
     
+    def _assess_zones_individually(self, records):
+        """Assess zones one request at a time, concurrently"""
+        assessments = []
+        
+        # LLM calls are I/O-bound, so assess zones concurrently
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.assess_zone_priority, record): record
+                for record in records
+            }
+            
+            for completed, future in enumerate(as_completed(futures), 1):
+                assessments.append(future.result())
+                
+                # Progress indicator
+                if completed % 3 == 0 or completed == len(records):
+                    print(f"   Assessed {completed}/{len(records)} zones...")
+        
+        return assessments
+    
     def identify_critical_zones(self, assessments, threshold=75):
         """
         Identify zones requiring immediate attention
@@ -130,22 +364,24 @@ Do not include any text before or after the JSON."""
     def generate_needs_report(self, assessments):
         """Generate summary report of needs assessment"""
         total_zones = len(assessments)
-        critical_zones = len([a for a in assessments if a['priority_score'] >= 75])
-        high_priority = len([a for a in assessments if 60 <= a['priority_score'] < 75])
+        scores = np.fromiter(
+            (a['priority_score'] for a in assessments),
+            dtype=np.float64,
+            count=total_zones
+        )
+        critical_zones = int((scores >= 75).sum())
+        high_priority = int(((scores >= 60) & (scores < 75)).sum())
         
         # Count critical needs
-        all_needs = []
-        for assessment in assessments:
-            all_needs.extend(assessment.get('critical_needs', []))
-        
-        from collections import Counter
-        needs_count = Counter(all_needs)
+        needs_count = Counter(chain.from_iterable(
+            a.get('critical_needs', ()) for a in assessments
+        ))
         
         report = {
             'total_zones_assessed': total_zones,
             'critical_zones': critical_zones,
             'high_priority_zones': high_priority,
-            'average_priority_score': sum(a['priority_score'] for a in assessments) / total_zones,
+            'average_priority_score': float(scores.mean()),
             'most_common_needs': dict(needs_count.most_common(5)),
             'top_5_priority_zones': [
                 {
@@ -3,61 +3,75 @@ Resource Allocation Agent - Optimizes distribution of available resources
 """
 import json
 import os
+import numpy as np
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.llm_wrapper import LocalLLM
+from utils.llm_wrapper import LLM_ERRORS, LocalLLM, Response
+from core.llm_pool import get_llm
+from utils.llm_cache import cached_invoke
+from utils.llm_parse import parse_llm_json
+from utils.json_utils import to_json
+from utils.semantic_cache import SemanticCache
+from agents._constants import FALLBACK_KEYS, RESOURCE_KEYS
+from agents._allocation_core import proportional_alloc, scale_to_capacity
 
 load_dotenv()
 
+_QUANTITY = {"type": "integer", "minimum": 0}
+
+# Shape of the allocation response (see LocalLLM.invoke's schema argument)
+ALLOCATION_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "zone_id": {"type": "string"},
+            "zone_name": {"type": "string"},
+            "priority_score": {"type": "number"},
+            "food_packages": _QUANTITY,
+            "water_liters": _QUANTITY,
+            "medical_kits": _QUANTITY,
+            "shelter_materials": _QUANTITY,
+            "blankets": _QUANTITY,
+            "hygiene_kits": _QUANTITY,
+            "justification": {"type": "string"},
+        },
+        "required": [
+            "zone_id", "zone_name", "priority_score", "food_packages", "water_liters",
+            "medical_kits", "shelter_materials", "blankets", "hygiene_kits", "justification",
+        ],
+    },
+}
+
+# Width of the log-scale buckets resource totals are matched in by the
+# semantic cache: a reused plan never spans more than a 10% supply change
+RESOURCE_TOLERANCE = 0.1
+
+# Output token budget: at least 512, plus room for every zone allocation.
+# One indented allocation with a one-sentence justification is ~380
+# characters, 110-160 Llama 3 tokens; the per-zone budget leaves headroom
+ALLOCATION_MAX_TOKENS = 512
+TOKENS_PER_ALLOCATION = 192
+
 
 class ResourceAllocationAgent:
     """Agent responsible for optimal resource allocation across zones"""
     
-    def __init__(self, temperature=0.2):
-        """
-        Initialize resource allocation agent
-        
-        Args:
-            temperature: LLM temperature (lower for more deterministic allocation)
-        """
-        self.llm = LocalLLM(temperature=temperature)
-    
-    def allocate_resources(self, prioritized_zones, available_resources, max_zones=8):
-        """
-        Create optimal allocation plan for resources
-        
-        Args:
-            prioritized_zones: List of zones sorted by priority
-            available_resources: Dictionary of available resources
-            max_zones: Maximum number of zones to serve in this cycle
-            
-        Returns:
-            List of allocation plans for each zone
-        """
-        print(f"\n📦 Allocating resources to top {max_zones} priority zones...")
-        
-        # Focus on top priority zones
-        target_zones = prioritized_zones[:max_zones]
-        
-        prompt = f"""You are a resource allocation optimizer for humanitarian aid distribution.
+    # Static prompt modules, sent ahead of the per-cycle data so the
+    # backend can reuse their cached attention state between calls
+    RULES_MODULE = """You are a resource allocation optimizer for humanitarian aid distribution.
 Your goal is to save the most lives and reduce suffering by optimally distributing limited resources.
 
-TOP PRIORITY ZONES (in order of urgency):
-{json.dumps(target_zones, indent=2)}
-
-AVAILABLE RESOURCES:
-{json.dumps(available_resources, indent=2)}
-
 ALLOCATION RULES:
 1. Highest priority zones MUST receive resources first
 2. Critical needs (food, water, medical) take precedence
 3. Ensure you don't exceed available resources
 4. Each zone should get resources proportional to population and need severity
 5. Reserve 10% of resources for emergencies
-6. Consider vulnerable populations (children, elderly, pregnant women)
-
-RESOURCE GUIDELINES:
+6. Consider vulnerable populations (children, elderly, pregnant women)"""
+    
+    GUIDELINES_MODULE = """RESOURCE GUIDELINES:
 - Food packages: ~2 per person per week
 - Water liters: ~15 per person per day  
 - Medical kits: 1 per 50 people with medical needs
@@ -66,7 +80,7 @@ RESOURCE GUIDELINES:
 
 Return ONLY valid JSON array of allocations:
 [
-  {{
+  {
     "zone_id": "Z01",
     "zone_name": "Sector A",
     "priority_score": 85.5,
@@ -77,54 +91,140 @@ Return ONLY valid JSON array of allocations:
     "blankets": 300,
     "hygiene_kits": 150,
     "justification": "Brief reason for this allocation"
-  }}
-]
+  }
+]"""
+    
+    def __init__(self, temperature=0.0, group='reasoning', quantization=None, llm=None):
+        """
+        Initialize resource allocation agent
+        
+        Args:
+            temperature: LLM temperature (lower for more deterministic allocation)
+            group: Model group to use when LLM_ENDPOINTS defines several backends
+            quantization: Model precision ('fp16', 'int8', 'int4'; None = default tag)
+            llm: LLM client to use instead of the shared one for group/quantization
+        """
+        self.llm = llm or get_llm(group, quantization)
+        self.temperature = temperature
+        self._system_prompt = LocalLLM.join_modules([self.RULES_MODULE, self.GUIDELINES_MODULE])
+        # Allocation prompts barely change between cycles, so similar
+        # inputs can reuse an earlier plan (opt-in, see SEMANTIC_CACHE)
+        self.cache = SemanticCache('allocation')
+    
+    def allocate_resources(self, prioritized_zones, available_resources, max_zones=8):
+        """
+        Create optimal allocation plan for resources
+        
+        Args:
+            prioritized_zones: List of zones sorted by priority
+            available_resources: Dictionary of available resources
+            max_zones: Maximum number of zones to serve in this cycle
+            
+        Returns:
+            List of allocation plans for each zone
+        """
+        print(f"\n📦 Allocating resources to top {max_zones} priority zones...")
+        
+        # Focus on top priority zones
+        target_zones = prioritized_zones[:max_zones]
+        
+        prompt = f"""TOP PRIORITY ZONES (in order of urgency):
+{to_json(target_zones)}
+
+AVAILABLE RESOURCES:
+{to_json(available_resources)}
 
 Ensure allocations don't exceed 90% of available resources (reserve 10% for emergencies).
 Do not include any text before or after the JSON array."""
 
+        signature, key_vec = self._semantic_key(target_zones, available_resources)
+        cached = self.cache.lookup(signature, key_vec)
+        
+        if cached is not None:
+            print("   Reusing allocation plan from a similar earlier cycle")
+            response = Response(cached)
+        else:
+            try:
+                response = cached_invoke(
+                    self.llm, prompt,
+                    system=self._system_prompt, temperature=self.temperature,
+                    max_tokens=max(ALLOCATION_MAX_TOKENS, TOKENS_PER_ALLOCATION * len(target_zones)),
+                    schema=ALLOCATION_SCHEMA
+                )
+            except LLM_ERRORS as e:
+                print(f"Allocation request failed: {e}")
+                return self._create_fallback_allocation(target_zones, available_resources)
+        
         try:
-            response = self.llm.invoke(prompt)
-            allocations = json.loads(response.content)
-            
-            # Validate allocations
-            validated = self._validate_allocations(allocations, available_resources)
-            
-            print(f"✓ Allocated resources to {len(validated)} zones")
-            self._print_allocation_summary(validated, available_resources)
-            
-            return validated
-            
+            # Schema-constrained output should always parse; kept as a safety
+            # net for backends that ignore the schema
+            allocations = parse_llm_json(response.content)
         except json.JSONDecodeError as e:
             print(f"JSON decode error: {e}")
             print(f"Response was: {response.content}")
             return self._create_fallback_allocation(target_zones, available_resources)
+        
+        if cached is None:
+            self.cache.store(signature, key_vec, response.content)
+        
+        # Validate allocations
+        validated = self._validate_allocations(allocations, available_resources)
+        
+        print(f"✓ Allocated resources to {len(validated)} zones")
+        self._print_allocation_summary(validated, available_resources)
+        
+        return validated
+    
+    def _semantic_key(self, target_zones, available_resources):
+        """
+        Canonical summary of an allocation request for the semantic cache
+        
+        Returns:
+            (signature, key_vec): zone IDs, resource names and bucketed
+            resource totals that must match exactly, and rounded priority
+            scores that must each be within the cache's tolerance
+        """
+        resource_types = sorted(
+            k for k, v in available_resources.items() if isinstance(v, (int, float))
+        )
+        # Totals are compared by relative size, priorities by absolute points
+        totals = np.log1p([available_resources[k] for k in resource_types])
+        buckets = np.floor(totals / np.log1p(RESOURCE_TOLERANCE)).astype(np.int64)
+        signature = (
+            tuple(z.get('zone_id') for z in target_zones),
+            tuple(resource_types),
+            tuple(buckets.tolist()),
+        )
+        priorities = np.round([float(z.get('priority_score', 0)) for z in target_zones])
+        return signature, priorities
     
     def _validate_allocations(self, allocations, available_resources):
         """Validate that allocations don't exceed available resources"""
-        # Calculate totals
-        totals = {}
-        for alloc in allocations:
-            for resource_type in available_resources.keys():
-                if resource_type in alloc and resource_type not in ['vehicles_available', 'personnel_available', 'budget_usd']:
-                    totals[resource_type] = totals.get(resource_type, 0) + alloc[resource_type]
+        # Zones x resource types; missing entries count as zero
+        quantities = np.array(
+            [[alloc.get(k, 0) for k in RESOURCE_KEYS] for alloc in allocations],
+            dtype=np.float64
+        ).reshape(-1, len(RESOURCE_KEYS))
+        # Resources not offered at the depot are never capped
+        capacity = np.array(
+            [available_resources.get(k, np.inf) for k in RESOURCE_KEYS],
+            dtype=np.float64
+        )
+        totals, scaled = scale_to_capacity(quantities, capacity)
         
         # Check for overallocation
-        overallocated = []
-        for resource_type, total in totals.items():
-            available = available_resources.get(resource_type, 0)
-            if total > available:
-                overallocated.append(f"{resource_type}: {total} > {available}")
-        
-        if overallocated:
+        over = totals > capacity
+        if over.any():
+            overallocated = [
+                f"{k}: {int(totals[j])} > {int(capacity[j])}"
+                for j, k in enumerate(RESOURCE_KEYS) if over[j]
+            ]
             print(f"⚠️  Warning: Overallocation detected for: {', '.join(overallocated)}")
-            # Scale down proportionally
-            for resource_type in available_resources.keys():
-                if resource_type in totals and totals[resource_type] > available_resources[resource_type]:
-                    scale_factor = available_resources[resource_type] / totals[resource_type]
-                    for alloc in allocations:
-                        if resource_type in alloc:
-                            alloc[resource_type] = int(alloc[resource_type] * scale_factor)
+            
+            # Write back the proportionally scaled-down quantities
+            over_keys = [(j, k) for j, k in enumerate(RESOURCE_KEYS) if over[j]]
+            for alloc, row in zip(allocations, scaled.tolist()):
+                alloc.update((k, row[j]) for j, k in over_keys if k in alloc)
         
         return allocations
     
@@ -132,21 +232,18 @@ Do not include any text before or after the JSON array."""
         """Create simple proportional allocation if AI fails"""
         print("⚠️  Using fallback allocation strategy...")
         
-        allocations = []
-        num_zones = len(zones)
+        caps = np.array(
+            [available_resources.get(k, 0) for k in FALLBACK_KEYS], dtype=np.float64
+        )
+        quantities = proportional_alloc(caps, len(zones))
         
-        for i, zone in enumerate(zones):
-            # Simple proportional allocation
-            proportion = (num_zones - i) / sum(range(1, num_zones + 1))
-            
+        allocations = []
+        for i, (zone, row) in enumerate(zip(zones, quantities.tolist())):
             alloc = {
                 'zone_id': zone['zone_id'],
                 'zone_name': zone.get('zone_name', 'Unknown'),
                 'priority_score': zone['priority_score'],
-                'food_packages': int(available_resources.get('food_packages', 0) * proportion * 0.9),
-                'water_liters': int(available_resources.get('water_liters', 0) * proportion * 0.9),
-                'medical_kits': int(available_resources.get('medical_kits', 0) * proportion * 0.9),
-                'shelter_materials': int(available_resources.get('shelter_materials', 0) * proportion * 0.9),
+                **dict(zip(FALLBACK_KEYS, row)),
                 'justification': f'Proportional allocation based on priority rank {i+1}'
             }
             allocations.append(alloc)
@@ -164,20 +261,25 @@ Do not include any text before or after the JSON array."""
                 percentage = (total_allocated / available * 100) if available > 0 else 0
                 print(f"   • {resource}: {total_allocated:,} / {available:,} ({percentage:.1f}%)")
     
-    def calculate_coverage(self, allocations, zones_df):
-        """Calculate what percentage of needs are being met"""
+    def calculate_coverage(self, allocations, zones_df, population_by_zone=None):
+        """
+        Calculate what percentage of needs are being met
+        
+        Args:
+            allocations: List of resource allocations per zone
+            zones_df: DataFrame with zone data
+            population_by_zone: Optional precomputed zone_id -> population map
+        """
+        if population_by_zone is None:
+            population_by_zone = dict(zip(zones_df['zone_id'].tolist(), zones_df['population'].tolist()))
+        
         coverage_stats = {
             'zones_served': len(allocations),
             'total_zones': len(zones_df),
-            'population_served': 0,
-            'total_population': zones_df['population'].sum(),
+            'population_served': sum(population_by_zone.get(a['zone_id'], 0) for a in allocations),
+            'total_population': sum(population_by_zone.values()),
         }
         
-        for alloc in allocations:
-            zone_data = zones_df[zones_df['zone_id'] == alloc['zone_id']]
-            if not zone_data.empty:
-                coverage_stats['population_served'] += zone_data.iloc[0]['population']
-        
         coverage_stats['coverage_percentage'] = (
             coverage_stats['population_served'] / coverage_stats['total_population'] * 100
         )
@@ -0,0 +1,237 @@
+"""
+LLM Pool - Routes each agent's LLM calls across several backends (Ollama or vLLM)
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from utils.llm_wrapper import LLM_ERRORS, CircuitOpen, backend_class
+
+load_dotenv()
+
+
+class _Endpoint:
+    """One backend plus the health and latency stats used to pick it"""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.ewma_latency = 0.0     # seconds; 0 until the first success
+        self.in_flight = 0
+        self.failures = 0           # consecutive
+        self.opened_at = None       # circuit open since (monotonic time)
+        self.probing = False        # a half-open probe request is in flight
+
+
+class LLMPool:
+    """
+    Pool of LLM backends grouped by role (e.g. "fast", "reasoning")
+
+    Requests go to the healthy endpoint of the group with the lowest
+    expected wait (latency EWMA scaled by requests in flight). An
+    endpoint that fails several times in a row is taken out of rotation
+    for a cooldown period. After that it is half-open: one probe request
+    is let through, and the endpoint rejoins the rotation if it succeeds
+    or waits another cooldown if it fails.
+    """
+
+    _from_env = None
+    _from_env_lock = threading.Lock()
+
+    def __init__(self, endpoints, failure_threshold=3, cooldown=30.0, ewma_alpha=0.3):
+        """
+        Args:
+            endpoints: List of dicts with "url" and optional "group"
+                       (default "default"), "backend" (default LLM_BACKEND),
+                       "model" and "quantization"
+            failure_threshold: Consecutive failures before an endpoint is skipped
+            cooldown: Seconds an unhealthy endpoint is skipped for
+            ewma_alpha: Weight of the newest latency sample
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+        self._groups = {}
+        for spec in endpoints:
+            llm = backend_class(spec.get('backend')).shared(
+                spec.get('quantization'), model=spec.get('model'), base_url=spec['url']
+            )
+            self._groups.setdefault(spec.get('group', 'default'), []).append(_Endpoint(llm))
+        self._clients = {}
+
+    @classmethod
+    def from_env(cls):
+        """Pool configured by LLM_ENDPOINTS (a JSON list), or None if unset"""
+        with cls._from_env_lock:
+            if cls._from_env is None:
+                endpoints = json.loads(os.getenv('LLM_ENDPOINTS') or '[]')
+                cls._from_env = cls(endpoints) if endpoints else False
+            return cls._from_env or None
+
+    def client(self, group):
+        """LocalLLM-compatible client that sends its calls to one group"""
+        with self._lock:
+            if group not in self._clients:
+                self._clients[group] = PooledLLM(self, group)
+            return self._clients[group]
+
+    def endpoints(self, group):
+        """Endpoints serving a group; unknown groups use "default" or every endpoint"""
+        if group in self._groups:
+            return self._groups[group]
+        if 'default' in self._groups:
+            return self._groups['default']
+        return [ep for eps in self._groups.values() for ep in eps]
+
+    def _candidates(self, group):
+        """Endpoints to try, best first; unhealthy ones only if nothing else is left"""
+        now = time.monotonic()
+        with self._lock:
+            endpoints = self.endpoints(group)
+            healthy = [
+                ep for ep in endpoints
+                if ep.opened_at is None or now - ep.opened_at >= self.cooldown
+            ]
+            ranked = sorted(healthy, key=lambda ep: ep.ewma_latency * (ep.in_flight + 1))
+            return ranked or sorted(endpoints, key=lambda ep: ep.opened_at)
+
+    def _started(self, endpoint):
+        """Start time of a request, or None if an open endpoint is already being probed"""
+        with self._lock:
+            if endpoint.opened_at is not None:
+                if endpoint.probing:
+                    return None
+                endpoint.probing = True
+            endpoint.in_flight += 1
+        return time.monotonic()
+
+    def _release(self, endpoint):
+        """End a request without counting it for or against the endpoint"""
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.probing = False
+
+    def _finished(self, endpoint, started, ok):
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.probing = False
+            if ok:
+                latency = time.monotonic() - started
+                endpoint.ewma_latency = (
+                    latency if endpoint.ewma_latency == 0.0
+                    else self.ewma_alpha * latency + (1 - self.ewma_alpha) * endpoint.ewma_latency
+                )
+                endpoint.failures = 0
+                endpoint.opened_at = None
+            else:
+                endpoint.failures += 1
+                if endpoint.failures >= self.failure_threshold:
+                    endpoint.opened_at = time.monotonic()
+
+    def invoke(self, prompt, group='default', **options):
+        """Send a prompt to the best endpoint of a group, failing over on errors"""
+        error = None
+        for endpoint in self._candidates(group):
+            started = self._started(endpoint)
+            if started is None:
+                continue
+            try:
+                response = endpoint.llm.invoke(prompt, **options)
+            except LLM_ERRORS as e:
+                self._finished(endpoint, started, ok=False)
+                error = e
+                continue
+            except BaseException:
+                # Not the endpoint's fault (e.g. bad options); don't count it
+                self._release(endpoint)
+                raise
+            self._finished(endpoint, started, ok=True)
+            return response
+        raise error or CircuitOpen(f"Every endpoint of group {group!r} is being probed")
+
+    async def ainvoke(self, prompt, group='default', **options):
+        """Async counterpart of invoke()"""
+        error = None
+        for endpoint in self._candidates(group):
+            started = self._started(endpoint)
+            if started is None:
+                continue
+            try:
+                response = await endpoint.llm.ainvoke(prompt, **options)
+            except LLM_ERRORS as e:
+                self._finished(endpoint, started, ok=False)
+                error = e
+                continue
+            except BaseException:
+                # Not the endpoint's fault (e.g. bad options); don't count it
+                self._release(endpoint)
+                raise
+            self._finished(endpoint, started, ok=True)
+            return response
+        raise error or CircuitOpen(f"Every endpoint of group {group!r} is being probed")
+
+    def close(self):
+        """Release every endpoint's pooled sync connections"""
+        for endpoints in self._groups.values():
+            for endpoint in endpoints:
+                endpoint.llm.close()
+    
+    async def aclose(self):
+        """Close every endpoint's aiohttp session for the running loop"""
+        for endpoints in self._groups.values():
+            for endpoint in endpoints:
+                await endpoint.llm.aclose()
+
+
+class PooledLLM:
+    """Drop-in stand-in for LocalLLM that routes through an LLMPool group"""
+
+    def __init__(self, pool, group, temperature=0.3):
+        self.pool = pool
+        self.group = group
+        self.temperature = temperature
+        # Part of the response cache key, so include every model in the group
+        self.model = '+'.join(sorted({ep.llm.model for ep in pool.endpoints(group)}))
+
+    def invoke(self, prompt, **options):
+        options.setdefault('temperature', self.temperature)
+        return self.pool.invoke(prompt, group=self.group, **options)
+
+    async def ainvoke(self, prompt, **options):
+        options.setdefault('temperature', self.temperature)
+        return await self.pool.ainvoke(prompt, group=self.group, **options)
+
+    async def batch_invoke(self, prompts, max_concurrency=8, **options):
+        """Send prompts concurrently, each routed to the best endpoint at the time"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def invoke_one(prompt):
+            async with semaphore:
+                return await self.ainvoke(prompt, **options)
+        
+        return list(await asyncio.gather(*(invoke_one(prompt) for prompt in prompts)))
+    
+    # The pool's endpoints are shared by every group's client, so the
+    # pool's owner closes them once (see HumanitarianAIOrchestrator.aclose)
+    
+    def close(self):
+        pass
+    
+    async def aclose(self):
+        pass
+
+
+def get_llm(group='default', quantization=None):
+    """
+    LLM client for an agent's model group
+
+    Returns a pooled client when LLM_ENDPOINTS is configured (endpoints
+    set their own quantization there), otherwise the process-wide client
+    of the LLM_BACKEND backend for the requested quantization.
+    """
+    pool = LLMPool.from_env()
+    if pool is None:
+        return backend_class().shared(quantization)
+    return pool.client(group)
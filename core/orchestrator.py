@@ -5,11 +5,22 @@ from agents.needs_assessment import NeedsAssessmentAgent
 from agents.resource_allocation import ResourceAllocationAgent
 from agents.logistics_coordinator import LogisticsCoordinatorAgent
 from agents.monitor_adaptation import MonitorAdaptationAgent
+from core.llm_pool import LLMPool
 from data.settlement_data import SettlementSimulator
-import json
+from utils.json_utils import RESULT_SECTIONS, write_json, write_jsonl
+import asyncio
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
+import threading
+
+# Simulated delivery challenges, their likelihood and effect on success
+CHALLENGES = ('none', 'weather_delay', 'road_conditions', 'security_concern', 'vehicle_breakdown')
+CHALLENGE_PROBS = (0.65, 0.15, 0.10, 0.07, 0.03)
+CHALLENGE_MULTIPLIERS = np.array([1.0, 0.95, 0.85, 0.80, 0.75])
+# Indexed by how many of the 75% / 95% success thresholds a delivery clears
+DELIVERY_STATUSES = np.array(['incomplete', 'partial', 'complete'])
 
 
 class HumanitarianAIOrchestrator:
@@ -18,13 +29,21 @@ class HumanitarianAIOrchestrator:
     for humanitarian crisis management and aid distribution optimization
     """
     
-    def __init__(self, num_zones=10, resource_scenario='normal'):
+    def __init__(self, num_zones=10, resource_scenario='normal', max_concurrent_llm_calls=8,
+                 quantization=None):
         """
         Initialize the orchestrator with all agents
         
         Args:
             num_zones: Number of settlement zones to simulate
             resource_scenario: 'abundant', 'normal', or 'scarce'
+            max_concurrent_llm_calls: Zones the needs assessment agent assesses
+                                      at once when it falls back to per-zone
+                                      requests (per cycle; other agents send
+                                      one request at a time)
+            quantization: Model precision for every agent ('fp16', 'int8', 'int4'),
+                          or a dict keyed by 'needs', 'allocation', 'logistics'
+                          and 'monitor'; None keeps the configured model tag
         """
         print("\n" + "="*70)
         print("INITIALIZING HUMANITARIAN AI SYSTEM")
@@ -34,29 +53,66 @@ class HumanitarianAIOrchestrator:
         self.simulator = SettlementSimulator(num_zones=num_zones)
         self.resource_scenario = resource_scenario
         
+        if not isinstance(quantization, dict):
+            quantization = dict.fromkeys(('needs', 'allocation', 'logistics', 'monitor'), quantization)
+        
         # Initialize all agents
         print("\n🤖 Initializing AI Agents...")
-        self.needs_agent = NeedsAssessmentAgent()
+        self.needs_agent = NeedsAssessmentAgent(
+            max_workers=max_concurrent_llm_calls, quantization=quantization.get('needs')
+        )
         print("  ✓ Needs Assessment Agent ready")
         
-        self.allocation_agent = ResourceAllocationAgent()
+        self.allocation_agent = ResourceAllocationAgent(quantization=quantization.get('allocation'))
         print("  ✓ Resource Allocation Agent ready")
         
-        self.logistics_agent = LogisticsCoordinatorAgent()
+        self.logistics_agent = LogisticsCoordinatorAgent(quantization=quantization.get('logistics'))
         print("  ✓ Logistics Coordinator Agent ready")
         
-        self.monitor_agent = MonitorAdaptationAgent()
+        self.monitor_agent = MonitorAdaptationAgent(quantization=quantization.get('monitor'))
         print("  ✓ Monitor & Adaptation Agent ready")
         
         # Storage for historical data
         self.cycle_history = []
         
+        # Saved cycles reference zone records in a snapshot file written
+        # once per version, instead of embedding them every cycle
+        self._last_zones_version = None
+        self._snapshot_file = None
+        self._snapshot_lock = threading.Lock()
+        
         print("\n✓ System initialization complete!\n")
     
     def run_distribution_cycle(self, cycle_number=1, max_zones_to_serve=8):
         """
         Execute one complete aid distribution cycle
         
+        Runs run_distribution_cycle_async() on a fresh event loop, so it
+        can't be called from inside a running loop (await the async
+        version there instead).
+        
+        Args:
+            cycle_number: Current cycle number
+            max_zones_to_serve: Maximum zones to serve in this cycle
+            
+        Returns:
+            Complete cycle results
+        """
+        async def run():
+            try:
+                return await self.run_distribution_cycle_async(cycle_number, max_zones_to_serve)
+            finally:
+                await self.aclose()
+        
+        return asyncio.run(run())
+    
+    async def run_distribution_cycle_async(self, cycle_number=1, max_zones_to_serve=8):
+        """
+        Execute one complete aid distribution cycle on the running event loop
+        
+        LLM-bound phases await the agents' async APIs; the remaining
+        blocking calls run in a worker thread so the loop stays free.
+        
         Args:
             cycle_number: Current cycle number
             max_zones_to_serve: Maximum zones to serve in this cycle
@@ -76,10 +132,10 @@ class HumanitarianAIOrchestrator:
         print("PHASE 1: SETTLEMENT DATA COLLECTION")
         print("-"*70)
         zones = self.simulator.zones
-        resources = self.simulator.get_available_resources(self.resource_scenario)
+        resources = self.simulator.get_available_resources(self.resource_scenario, cycle_number)
         
         print(f"✓ Loaded {len(zones)} settlement zones")
-        print(f"✓ Total population: {zones['population'].sum():,}")
+        print(f"✓ Total population: {self.simulator.total_population:,}")
         print(f"\nAvailable Resources:")
         for resource, amount in resources.items():
             if resource not in ['vehicles_available', 'personnel_available', 'budget_usd']:
@@ -89,7 +145,7 @@ class HumanitarianAIOrchestrator:
         print("\n" + "-"*70)
         print("PHASE 2: NEEDS ASSESSMENT")
         print("-"*70)
-        prioritized_zones = self.needs_agent.assess_all_zones(zones)
+        prioritized_zones = await self.needs_agent.assess_all_zones_async(zones)
         needs_report = self.needs_agent.generate_needs_report(prioritized_zones)
         
         print(f"\nAssessment Summary:")
@@ -105,13 +161,16 @@ class HumanitarianAIOrchestrator:
         print("\n" + "-"*70)
         print("PHASE 3: RESOURCE ALLOCATION OPTIMIZATION")
         print("-"*70)
-        allocations = self.allocation_agent.allocate_resources(
+        allocations = await asyncio.to_thread(
+            self.allocation_agent.allocate_resources,
             prioritized_zones, 
             resources, 
             max_zones=max_zones_to_serve
         )
         
-        coverage = self.allocation_agent.calculate_coverage(allocations, zones)
+        coverage = self.allocation_agent.calculate_coverage(
+            allocations, zones, self.simulator.population_by_zone
+        )
         print(f"\nAllocation Coverage:")
         print(f"  • Zones served: {coverage['zones_served']}/{coverage['total_zones']}")
         print(f"  • Population covered: {coverage['population_served']:,}/{coverage['total_population']:,}")
@@ -121,7 +180,7 @@ class HumanitarianAIOrchestrator:
         print("\n" + "-"*70)
         print("PHASE 4: LOGISTICS & ROUTE PLANNING")
         print("-"*70)
-        delivery_plan = self.logistics_agent.plan_delivery_routes(allocations, zones)
+        delivery_plan = await self.logistics_agent.plan_delivery_routes_async(allocations, zones)
         
         print(f"\nDelivery Plan:")
         print(f"  • Routes created: {len(delivery_plan['routes'])}")
@@ -144,10 +203,11 @@ class HumanitarianAIOrchestrator:
         print("PHASE 5: DELIVERY EXECUTION & MONITORING")
         print("-"*70)
         print("Simulating delivery execution...")
-        actual_outcomes = self._simulate_delivery_execution(allocations)
+        actual_outcomes = self._simulate_delivery_execution(allocations, cycle_number)
         
         # Analyze outcomes
-        analysis = self.monitor_agent.analyze_delivery_outcomes(
+        analysis = await asyncio.to_thread(
+            self.monitor_agent.analyze_delivery_outcomes,
             delivery_plan, 
             actual_outcomes, 
             allocations
@@ -178,11 +238,7 @@ class HumanitarianAIOrchestrator:
             'duration_seconds': cycle_duration,
             'resource_scenario': self.resource_scenario,
             
-            'settlement_data': {
-                'total_zones': len(zones),
-                'total_population': int(zones['population'].sum()),
-                'zones_data': zones.to_dict('records')
-            },
+            'settlement_data': self._settlement_snapshot(),
             
             'available_resources': resources,
             
@@ -228,85 +284,131 @@ class HumanitarianAIOrchestrator:
         
         return complete_results
     
-    def _simulate_delivery_execution(self, allocations):
+    def _settlement_snapshot(self):
+        """
+        Settlement section of the cycle results
+        
+        Every cycle holds the zone records, so results are usable without
+        being saved; cycles of the same zones version share one record list.
+        Cycles also list the zones changed since the previous one.
+        """
+        version = self.simulator.version
+        records = self.simulator.to_records()
+        
+        snapshot = {
+            'total_zones': len(records),
+            'total_population': self.simulator.total_population,
+            'zones_version': version,
+            'zones_data': records,
+        }
+        if self._last_zones_version is None:
+            snapshot['changed_zone_ids'] = []
+        else:
+            snapshot['changed_zone_ids'] = self.simulator.changed_zone_ids(self._last_zones_version)
+        self._last_zones_version = version
+        
+        return snapshot
+    
+    async def aclose(self):
+        """Release the agents' async HTTP sessions for the running loop"""
+        llms = {id(agent.llm): agent.llm for agent in (
+            self.needs_agent, self.allocation_agent,
+            self.logistics_agent, self.monitor_agent
+        )}
+        for llm in llms.values():
+            await llm.aclose()
+        
+        # Pooled clients leave their endpoints to the pool, closed once here
+        pool = LLMPool.from_env()
+        if pool is not None:
+            await pool.aclose()
+    
+    def _simulate_delivery_execution(self, allocations, cycle_number=1):
         """
         Simulate actual delivery with realistic variations
         
         Args:
             allocations: Planned resource allocations
+            cycle_number: Cycle being simulated; each cycle draws from its
+                          own generator, so results are repeatable per seed
             
         Returns:
             List of actual delivery outcomes
         """
-        outcomes = []
+        rng = self.simulator.delivery_rng(cycle_number)
+        k = len(allocations)
         
-        for alloc in allocations:
-            # Simulate delivery success with realistic factors
-            base_success = np.random.uniform(0.85, 1.0)
-            
-            # Random challenges that might occur
-            challenges = ['none', 'weather_delay', 'road_conditions', 'security_concern', 'vehicle_breakdown']
-            challenge_probs = [0.65, 0.15, 0.10, 0.07, 0.03]
-            challenge = np.random.choice(challenges, p=challenge_probs)
-            
-            # Adjust success rate based on challenge
-            if challenge == 'weather_delay':
-                success_rate = base_success * 0.95
-            elif challenge == 'road_conditions':
-                success_rate = base_success * 0.85
-            elif challenge == 'security_concern':
-                success_rate = base_success * 0.80
-            elif challenge == 'vehicle_breakdown':
-                success_rate = base_success * 0.75
-            else:
-                success_rate = base_success
-            
-            outcome = {
+        # Simulate delivery success with realistic factors, drawn for all zones at once
+        base_success = rng.uniform(0.85, 1.0, k)
+        
+        # Random challenges that might occur, and their effect on success
+        challenge_idx = rng.choice(len(CHALLENGES), size=k, p=CHALLENGE_PROBS)
+        success_rate = base_success * CHALLENGE_MULTIPLIERS[challenge_idx]
+        
+        status_bin = (success_rate >= 0.75).astype(np.int8) + (success_rate >= 0.95).astype(np.int8)
+        status = DELIVERY_STATUSES[status_bin]
+        
+        excluded = ('zone_id', 'zone_name', 'priority_score', 'justification')
+        return [
+            {
                 'zone_id': alloc['zone_id'],
                 'zone_name': alloc.get('zone_name', 'Unknown'),
                 'planned_delivery': {
-                    key: alloc[key] for key in alloc.keys() 
-                    if key not in ['zone_id', 'zone_name', 'priority_score', 'justification']
+                    key: value for key, value in alloc.items() if key not in excluded
                 },
-                'delivered_percentage': round(success_rate * 100, 1),
-                'challenges': challenge,
-                'delivery_status': 'complete' if success_rate >= 0.95 else 'partial' if success_rate >= 0.75 else 'incomplete'
+                'delivered_percentage': pct,
+                'challenges': CHALLENGES[c],
+                'delivery_status': st
             }
-            outcomes.append(outcome)
-        
-        return outcomes
+            for alloc, pct, c, st in zip(
+                allocations,
+                np.round(success_rate * 100, 1).tolist(),
+                challenge_idx.tolist(),
+                status.tolist()
+            )
+        ]
     
     def save_results(self, results, output_dir='outputs'):
-    
-        import numpy as np
-    
-        def convert_numpy(obj):
-            """Convert numpy types to Python native types"""
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {key: convert_numpy(value) for key, value in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_numpy(item) for item in obj]
-            return obj
-        
-        os.makedirs(output_dir, exist_ok=True)
+        """
+        Save cycle results to their own directory: the per-zone lists as
+        JSON Lines files (see RESULT_SECTIONS) and everything else in a
+        manifest that names them. Files are compact and zstd-compressed
+        unless RESULTS_COMPRESS=0 (numpy values are serialized natively).
         
+        Returns:
+            Path of the written manifest
+        """
         cycle_num = results['cycle_number']
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'{output_dir}/cycle_{cycle_num}_{timestamp}.json'
-        
-        # Convert numpy types before saving
-        results_clean = convert_numpy(results)
-        
-        with open(filename, 'w') as f:
-            json.dump(results_clean, f, indent=2)
-        
-        print(f"✓ Results saved to: {filename}")
+        cycle_dir = f'{output_dir}/cycle_{cycle_num}_{timestamp}'
+        os.makedirs(cycle_dir, exist_ok=True)
+        
+        # Zone records for this version go to a snapshot file in the first
+        # cycle directory saved with it; the manifest references that file
+        # relative to its own directory instead of embedding the records
+        settlement = dict(results['settlement_data'])
+        version = settlement['zones_version']
+        records = settlement.pop('zones_data')
+        # Cycles may be saved from several worker threads at once
+        with self._snapshot_lock:
+            if self._snapshot_file is None or self._snapshot_file[0] != version:
+                path = write_json(records, f'{cycle_dir}/zones_snapshot.json')
+                self._snapshot_file = (version, path)
+            snapshot_path = self._snapshot_file[1]
+        settlement['zones_snapshot'] = os.path.relpath(snapshot_path, cycle_dir)
+        
+        # One record per line, so readers can parse each list directly into a frame
+        manifest = dict(results, settlement_data=settlement)
+        sections = {}
+        for stem, (section, key) in RESULT_SECTIONS.items():
+            manifest[section] = {k: v for k, v in results[section].items() if k != key}
+            section_file = write_jsonl(results[section][key], f'{cycle_dir}/{stem}.jsonl')
+            sections[stem] = os.path.basename(section_file)
+        manifest['sections'] = sections
+        
+        filename = write_json(manifest, f'{cycle_dir}/manifest.json')
+        
+        print(f"✓ Results saved to: {cycle_dir}")
         return filename
     
     def run_multiple_cycles(self, num_cycles=3, max_zones_per_cycle=8):
@@ -353,6 +455,66 @@ class HumanitarianAIOrchestrator:
         
         return all_results
     
+    async def run_multiple_cycles_async(self, num_cycles=3, max_zones_per_cycle=8,
+                                        max_concurrent_cycles=2, on_cycle_saved=None):
+        """
+        Run multiple distribution cycles concurrently on the running event loop
+        
+        Cycles only read the settlement state and draw from per-cycle
+        random generators, so they can overlap without changing their
+        results; their console output interleaves. Each cycle's results are
+        saved in a worker thread as soon as it finishes.
+        
+        Each cycle's needs assessment fans out on its own, so up to
+        max_concurrent_cycles times the constructor's max_concurrent_llm_calls
+        LLM requests can be in flight at once.
+        
+        Args:
+            num_cycles: Number of cycles to run
+            max_zones_per_cycle: Max zones to serve per cycle
+            max_concurrent_cycles: Cap on cycles in flight at once
+            on_cycle_saved: Optional callable run in a worker thread with
+                            each saved manifest path (e.g. to visualize it)
+            
+        Returns:
+            List of all cycle results, in cycle order
+        """
+        print("\n" + "="*70)
+        print(f"RUNNING {num_cycles} DISTRIBUTION CYCLES")
+        print("="*70)
+        
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrent_cycles)
+        
+        async def run_cycle(cycle, executor):
+            async with semaphore:
+                results = await self.run_distribution_cycle_async(cycle, max_zones_per_cycle)
+            results_file = await loop.run_in_executor(executor, self.save_results, results)
+            if on_cycle_saved is not None:
+                await loop.run_in_executor(executor, on_cycle_saved, results_file)
+            return results
+        
+        with ThreadPoolExecutor(max_workers=max_concurrent_cycles) as executor:
+            try:
+                all_results = list(await asyncio.gather(*(
+                    run_cycle(cycle, executor) for cycle in range(1, num_cycles + 1)
+                )))
+            finally:
+                await self.aclose()
+        
+        # Cycles finish in any order; keep the history in cycle order
+        self.cycle_history.sort(key=lambda r: r['cycle_number'])
+        
+        for i in range(1, len(all_results)):
+            trends = self.monitor_agent.track_historical_performance(
+                all_results[i]['delivery_outcomes']['analysis'],
+                [r['delivery_outcomes']['analysis'] for r in all_results[:i]]
+            )
+            print(f"\n📈 Cycle #{i + 1} Performance Trend: {trends['trend'].upper()}")
+            print(f"   Improvement: {trends['improvement_percentage']:+.1f}%")
+        
+        return all_results
+    
     def generate_summary_report(self):
         """Generate summary report across all cycles"""
         if not self.cycle_history:
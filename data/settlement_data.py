@@ -3,8 +3,56 @@ Settlement data simulator for refugee camp scenarios
 """
 import numpy as np
 import pandas as pd
+from functools import lru_cache
 from datetime import datetime, timedelta
 
+# Numeric zone fields, stored column-wise in one structured array
+ZONE_DTYPE = np.dtype([
+    ('population', 'i4'),
+    ('children_ratio', 'f8'),
+    ('elderly_ratio', 'f8'),
+    ('pregnant_women', 'i4'),
+    ('chronic_illness_cases', 'i4'),
+    ('food_shortage', 'f8'),
+    ('water_shortage', 'f8'),
+    ('medical_severity', 'f8'),
+    ('shelter_damage', 'f8'),
+    ('sanitation_need', 'f8'),
+    ('distance_from_depot', 'f8'),
+    ('last_aid_received_days', 'i4'),
+    ('previous_aid_satisfaction', 'f8'),
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+])
+
+# String zone fields, kept as parallel object arrays
+LABEL_FIELDS = ('zone_id', 'zone_name', 'road_condition', 'accessibility', 'security_level')
+
+# Column order of the DataFrame view (matches the generated zone records)
+ZONE_COLUMNS = (
+    'zone_id', 'zone_name', 'population', 'children_ratio', 'elderly_ratio',
+    'pregnant_women', 'chronic_illness_cases', 'food_shortage', 'water_shortage',
+    'medical_severity', 'shelter_damage', 'sanitation_need', 'distance_from_depot',
+    'road_condition', 'accessibility', 'security_level', 'last_aid_received_days',
+    'previous_aid_satisfaction', 'latitude', 'longitude',
+)
+
+# Draw range [low, high) per resource at the distribution center
+RESOURCE_RANGES = {
+    'food_packages': (5000, 15000),
+    'water_liters': (10000, 30000),
+    'medical_kits': (200, 800),
+    'shelter_materials': (100, 500),
+    'blankets': (1000, 3000),
+    'hygiene_kits': (500, 1500),
+    'vehicles_available': (5, 12),
+    'personnel_available': (20, 50),
+    'budget_usd': (50000, 150000),
+}
+# Capacity that doesn't scale with the supply scenario
+UNSCALED_RESOURCES = ('vehicles_available', 'personnel_available')
+
+
 class SettlementSimulator:
     """Simulates realistic refugee settlement data"""
     
@@ -17,57 +65,141 @@ class SettlementSimulator:
             seed: Random seed for reproducibility
         """
         np.random.seed(seed)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
         self.num_zones = num_zones
-        self.zones = self.generate_zones()
+        self.zones_arr, self.zone_labels = self.generate_zones()
+        self._id_to_idx = {zone_id: i for i, zone_id in enumerate(self.zone_labels['zone_id'])}
+        self._zones_df = None
+        # Bumped on every zone mutation; per-zone entries record the last change
+        self._version = 0
+        self._zone_versions = np.zeros(num_zones, dtype=np.int64)
+        self._records_cache = (None, None)
+        # Population never changes between cycles; reused for coverage stats
+        self.population_by_zone = dict(
+            zip(self.zone_labels['zone_id'], self.zones_arr['population'].tolist())
+        )
+        self.total_population = int(self.zones_arr['population'].sum())
+        # Per-instance memo of the resources drawn for each (scenario, cycle)
+        self._resources_for = lru_cache(maxsize=64)(self._draw_cycle_resources)
+    
+    @property
+    def version(self):
+        """Counter that increases whenever zone data changes"""
+        return self._version
+    
+    def to_records(self):
+        """Zone records as a list of dicts, rebuilt only after the zone data changes"""
+        version, records = self._records_cache
+        if version != self._version:
+            records = self.zones.to_dict('records')
+            self._records_cache = (self._version, records)
+        return records
+    
+    def changed_zone_ids(self, since_version):
+        """IDs of zones modified after the given version"""
+        changed = np.flatnonzero(self._zone_versions > since_version)
+        return self.zone_labels['zone_id'][changed].tolist()
+    
+    @property
+    def zones(self):
+        """DataFrame view of the zones, rebuilt only after the zone data changes"""
+        if self._zones_df is None:
+            self._zones_df = self.as_dataframe()
+        return self._zones_df
+    
+    def as_dataframe(self):
+        """
+        Build a DataFrame from the zone arrays
+        
+        Returns:
+            DataFrame indexed by zone_id (the zone_id column is kept)
+        """
+        columns = {
+            name: self.zone_labels[name] if name in self.zone_labels else self.zones_arr[name]
+            for name in ZONE_COLUMNS
+        }
+        # Index on zone_id so lookups are hash-based instead of full scans
+        return pd.DataFrame(columns, index=list(self.zone_labels['zone_id']), copy=True)
         
     def generate_zones(self):
-        """Generate realistic refugee settlement zones with various needs"""
-        zones = []
-        
-        for i in range(self.num_zones):
-            population = np.random.randint(500, 3000)
-            
-            zone = {
-                'zone_id': f'Z{i+1:02d}',
-                'zone_name': f'Sector {chr(65+i)}',  # A, B, C, etc.
-                'population': population,
-                'children_ratio': round(np.random.uniform(0.30, 0.50), 2),
-                'elderly_ratio': round(np.random.uniform(0.05, 0.15), 2),
-                'pregnant_women': np.random.randint(10, 50),
-                'chronic_illness_cases': np.random.randint(20, 100),
-                
-                # Need indicators (0-1 scale, higher = more shortage)
-                'food_shortage': round(np.random.uniform(0.3, 0.95), 2),
-                'water_shortage': round(np.random.uniform(0.2, 0.85), 2),
-                'medical_severity': round(np.random.uniform(0.2, 0.90), 2),
-                'shelter_damage': round(np.random.uniform(0.1, 0.70), 2),
-                'sanitation_need': round(np.random.uniform(0.3, 0.80), 2),
-                
-                # Logistics data
-                'distance_from_depot': round(np.random.uniform(1.0, 20.0), 1),  # km
-                'road_condition': np.random.choice(['good', 'fair', 'poor'], p=[0.3, 0.4, 0.3]),
-                'accessibility': np.random.choice(['easy', 'moderate', 'difficult'], p=[0.4, 0.4, 0.2]),
-                'security_level': np.random.choice(['safe', 'caution', 'risk'], p=[0.6, 0.3, 0.1]),
-                
-                # Historical data
-                'last_aid_received_days': np.random.randint(1, 30),
-                'previous_aid_satisfaction': round(np.random.uniform(0.5, 0.95), 2),
-                
-                # Coordinates (simulated)
-                'latitude': round(np.random.uniform(30.0, 35.0), 4),
-                'longitude': round(np.random.uniform(40.0, 45.0), 4),
-            }
-            zones.append(zone)
-        
-        return pd.DataFrame(zones)
+        """
+        Generate realistic refugee settlement zones with various needs
+        
+        Returns:
+            (zones_arr, zone_labels): ZONE_DTYPE structured array of the
+            numeric fields and a dict of object arrays for LABEL_FIELDS
+        """
+        n = self.num_zones
+        rng = self.rng
+        
+        # One batched draw per field instead of one draw per field per zone
+        zones_arr = np.zeros(n, dtype=ZONE_DTYPE)
+        zones_arr['population'] = rng.integers(500, 3000, size=n)
+        zones_arr['children_ratio'] = np.round(rng.uniform(0.30, 0.50, n), 2)
+        zones_arr['elderly_ratio'] = np.round(rng.uniform(0.05, 0.15, n), 2)
+        zones_arr['pregnant_women'] = rng.integers(10, 50, size=n)
+        zones_arr['chronic_illness_cases'] = rng.integers(20, 100, size=n)
+        
+        # Need indicators (0-1 scale, higher = more shortage)
+        zones_arr['food_shortage'] = np.round(rng.uniform(0.3, 0.95, n), 2)
+        zones_arr['water_shortage'] = np.round(rng.uniform(0.2, 0.85, n), 2)
+        zones_arr['medical_severity'] = np.round(rng.uniform(0.2, 0.90, n), 2)
+        zones_arr['shelter_damage'] = np.round(rng.uniform(0.1, 0.70, n), 2)
+        zones_arr['sanitation_need'] = np.round(rng.uniform(0.3, 0.80, n), 2)
+        
+        # Logistics data
+        zones_arr['distance_from_depot'] = np.round(rng.uniform(1.0, 20.0, n), 1)  # km
+        
+        # Historical data
+        zones_arr['last_aid_received_days'] = rng.integers(1, 30, size=n)
+        zones_arr['previous_aid_satisfaction'] = np.round(rng.uniform(0.5, 0.95, n), 2)
+        
+        # Coordinates (simulated)
+        zones_arr['latitude'] = np.round(rng.uniform(30.0, 35.0, n), 4)
+        zones_arr['longitude'] = np.round(rng.uniform(40.0, 45.0, n), 4)
+        
+        zone_labels = {
+            'zone_id': np.array([f'Z{i+1:02d}' for i in range(n)], dtype=object),
+            'zone_name': np.array([f'Sector {chr(65+i)}' for i in range(n)], dtype=object),  # A, B, C, etc.
+            'road_condition': rng.choice(['good', 'fair', 'poor'], size=n, p=[0.3, 0.4, 0.3]).astype(object),
+            'accessibility': rng.choice(['easy', 'moderate', 'difficult'], size=n, p=[0.4, 0.4, 0.2]).astype(object),
+            'security_level': rng.choice(['safe', 'caution', 'risk'], size=n, p=[0.6, 0.3, 0.1]).astype(object),
+        }
+        
+        return zones_arr, zone_labels
     
-    def get_available_resources(self, scenario='normal'):
+    def get_available_resources(self, scenario='normal', cycle=None):
         """
         Simulate available resources at distribution center
         
         Args:
             scenario: 'abundant', 'normal', or 'scarce'
+            cycle: Distribution cycle number; when given, the same
+                   (scenario, cycle) always yields the same resources
+        """
+        if cycle is None:
+            return self._draw_resources(self.rng, scenario)
+        # Copy so callers can't modify the memoized result
+        return dict(self._resources_for(scenario, cycle))
+    
+    def _draw_cycle_resources(self, scenario, cycle):
+        """Resources for one cycle, from a generator seeded by (seed, cycle)"""
+        rng = np.random.Generator(np.random.PCG64([self.seed, cycle]))
+        return self._draw_resources(rng, scenario)
+    
+    def delivery_rng(self, cycle):
         """
+        Random generator for simulating one cycle's deliveries
+        
+        Seeded by (seed, cycle) on a stream of its own, so outcomes don't
+        depend on the order cycles run in and don't repeat the resource draws.
+        """
+        return np.random.default_rng([self.seed, cycle, 1])
+    
+    @staticmethod
+    def _draw_resources(rng, scenario):
+        """Draw every resource in one call and apply the scenario multiplier"""
         multipliers = {
             'abundant': 1.5,
             'normal': 1.0,
@@ -75,36 +207,42 @@ class SettlementSimulator:
         }
         mult = multipliers.get(scenario, 1.0)
         
-        return {
-            'food_packages': int(np.random.randint(5000, 15000) * mult),
-            'water_liters': int(np.random.randint(10000, 30000) * mult),
-            'medical_kits': int(np.random.randint(200, 800) * mult),
-            'shelter_materials': int(np.random.randint(100, 500) * mult),
-            'blankets': int(np.random.randint(1000, 3000) * mult),
-            'hygiene_kits': int(np.random.randint(500, 1500) * mult),
-            'vehicles_available': np.random.randint(5, 12),
-            'personnel_available': np.random.randint(20, 50),
-            'budget_usd': int(np.random.randint(50000, 150000) * mult)
-        }
+        names = list(RESOURCE_RANGES)
+        low, high = np.array(list(RESOURCE_RANGES.values())).T
+        scale = np.array([1.0 if name in UNSCALED_RESOURCES else mult for name in names])
+        
+        amounts = (rng.integers(low, high) * scale).astype(np.int64)
+        return dict(zip(names, amounts.tolist()))
     
     def get_zone_by_id(self, zone_id):
         """Get specific zone data by ID"""
-        return self.zones[self.zones['zone_id'] == zone_id].iloc[0].to_dict()
+        idx = self._id_to_idx[zone_id]
+        row = self.zones_arr[idx]
+        return {
+            name: self.zone_labels[name][idx] if name in self.zone_labels else row[name].item()
+            for name in ZONE_COLUMNS
+        }
     
     def update_zone_after_delivery(self, zone_id, delivered_resources):
         """Update zone status after aid delivery"""
-        idx = self.zones[self.zones['zone_id'] == zone_id].index[0]
+        idx = self._id_to_idx[zone_id]
+        zones = self.zones_arr
         
         # Reduce shortage indicators based on delivered resources
         if 'food_packages' in delivered_resources:
-            self.zones.at[idx, 'food_shortage'] *= 0.5
+            zones['food_shortage'][idx] *= 0.5
         if 'water_liters' in delivered_resources:
-            self.zones.at[idx, 'water_shortage'] *= 0.5
+            zones['water_shortage'][idx] *= 0.5
         if 'medical_kits' in delivered_resources:
-            self.zones.at[idx, 'medical_severity'] *= 0.6
+            zones['medical_severity'][idx] *= 0.6
         
         # Update last aid received
-        self.zones.at[idx, 'last_aid_received_days'] = 0
+        zones['last_aid_received_days'][idx] = 0
+        
+        # DataFrame view is stale now
+        self._version += 1
+        self._zone_versions[idx] = self._version
+        self._zones_df = None
     
     def export_to_csv(self, filename='outputs/settlement_data.csv'):
         """Export zone data to CSV"""
@@ -116,12 +254,13 @@ class SettlementSimulator:
         print("\n" + "="*60)
         print("SETTLEMENT DATA SUMMARY")
         print("="*60)
-        print(f"Total Zones: {len(self.zones)}")
-        print(f"Total Population: {self.zones['population'].sum():,}")
-        print(f"Average Food Shortage: {self.zones['food_shortage'].mean():.2f}")
-        print(f"Average Water Shortage: {self.zones['water_shortage'].mean():.2f}")
-        print(f"Zones with High Medical Need (>0.7): {len(self.zones[self.zones['medical_severity'] > 0.7])}")
-        print(f"Difficult Access Zones: {len(self.zones[self.zones['accessibility'] == 'difficult'])}")
+        zones = self.zones_arr
+        print(f"Total Zones: {len(zones)}")
+        print(f"Total Population: {self.total_population:,}")
+        print(f"Average Food Shortage: {zones['food_shortage'].mean():.2f}")
+        print(f"Average Water Shortage: {zones['water_shortage'].mean():.2f}")
+        print(f"Zones with High Medical Need (>0.7): {np.count_nonzero(zones['medical_severity'] > 0.7)}")
+        print(f"Difficult Access Zones: {np.count_nonzero(self.zone_labels['accessibility'] == 'difficult')}")
         print("="*60 + "\n")
 
 
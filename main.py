@@ -4,6 +4,7 @@ Run this file to execute the complete multi-agent system
 """
 from core.orchestrator import HumanitarianAIOrchestrator
 from utils.visualization import visualize_results
+import asyncio
 import sys
 import os
 
@@ -64,11 +65,17 @@ def main():
             visualize_results(results_file, create_all=True)
             
         else:
-            # Run multiple cycles
-            all_results = orchestrator.run_multiple_cycles(
+            # Run multiple cycles concurrently; each cycle's dashboard and
+            # route map are built in a worker thread next to its results
+            def visualize_cycle(results_file):
+                visualize_results(results_file, create_all=True,
+                                  output_dir=os.path.dirname(results_file))
+            
+            all_results = asyncio.run(orchestrator.run_multiple_cycles_async(
                 num_cycles=NUM_CYCLES,
-                max_zones_per_cycle=MAX_ZONES_PER_CYCLE
-            )
+                max_zones_per_cycle=MAX_ZONES_PER_CYCLE,
+                on_cycle_saved=visualize_cycle
+            ))
             
             # Generate summary report
             summary = orchestrator.generate_summary_report()
@@ -82,11 +89,6 @@ def main():
                   f"({summary['best_cycle']['performance_metrics']['success_rate']:.1f}%)")
             print("="*70)
             
-            # Create visualizations for the latest cycle
-            print("\n📊 Generating visualizations for latest cycle...")
-            latest_results_file = orchestrator.save_results(all_results[-1])
-            visualize_results(latest_results_file, create_all=True)
-            
             # Create performance timeline
             from utils.visualization import HumanitarianDashboard
             dashboard = HumanitarianDashboard(all_results[0])
@@ -97,11 +99,14 @@ def main():
         print("✓ SYSTEM EXECUTION COMPLETED SUCCESSFULLY")
         print("="*70)
         print("\n📁 Output Files:")
-        print("  • Cycle results: outputs/cycle_*.json")
-        print("  • Dashboard: outputs/dashboard.html")
-        print("  • Route map: outputs/route_map.html")
+        print("  • Cycle results: outputs/cycle_*/ (manifest + JSON Lines per section)")
         if NUM_CYCLES > 1:
+            print("  • Dashboards: outputs/cycle_*/dashboard.html")
+            print("  • Route maps: outputs/cycle_*/route_map.html")
             print("  • Timeline: outputs/timeline.html")
+        else:
+            print("  • Dashboard: outputs/dashboard.html")
+            print("  • Route map: outputs/route_map.html")
         print("\n💡 Open HTML files in your browser to view interactive visualizations")
         print("="*70 + "\n")
         
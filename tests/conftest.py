@@ -0,0 +1,84 @@
+"""
+Shared fixtures: stub LLM clients and a small simulated settlement
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep tests off the user's caches and LLM servers
+os.environ['LLM_CACHE'] = '0'
+os.environ['SEMANTIC_CACHE'] = '0'
+os.environ.pop('LLM_ENDPOINTS', None)
+
+from core.orchestrator import HumanitarianAIOrchestrator
+from data.settlement_data import SettlementSimulator
+from utils.llm_wrapper import CircuitOpen, Response
+
+
+class StubLLM:
+    """LocalLLM stand-in that answers every prompt with reply(prompt)"""
+    
+    def __init__(self, reply=lambda prompt: '{}'):
+        self.reply = reply
+        self.model = 'stub'
+        self.temperature = 0.0
+        self.base_url = 'stub://'
+        self.prompts = []
+    
+    def invoke(self, prompt, **options):
+        self.prompts.append(prompt)
+        return Response(self.reply(prompt))
+    
+    async def ainvoke(self, prompt, **options):
+        return self.invoke(prompt, **options)
+    
+    async def batch_invoke(self, prompts, max_concurrency=8, **options):
+        return [self.invoke(prompt, **options) for prompt in prompts]
+    
+    def close(self):
+        pass
+    
+    async def aclose(self):
+        pass
+
+
+class FailingLLM(StubLLM):
+    """Client whose every request fails with the given exception"""
+    
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+    
+    def invoke(self, prompt, **options):
+        self.prompts.append(prompt)
+        raise self.error
+
+
+@pytest.fixture
+def simulator():
+    return SettlementSimulator(num_zones=6)
+
+
+@pytest.fixture
+def zones(simulator):
+    return simulator.zones
+
+
+@pytest.fixture
+def resources(simulator):
+    return simulator.get_available_resources('normal', cycle=1)
+
+
+@pytest.fixture
+def orchestrator(monkeypatch, tmp_path):
+    """Orchestrator whose agents all run on their non-LLM fallbacks, from a scratch directory"""
+    monkeypatch.chdir(tmp_path)
+    orchestrator = HumanitarianAIOrchestrator(num_zones=6)
+    llm = FailingLLM(CircuitOpen('offline'))
+    for agent in (orchestrator.needs_agent, orchestrator.allocation_agent,
+                  orchestrator.logistics_agent, orchestrator.monitor_agent):
+        agent.llm = llm
+    return orchestrator
@@ -0,0 +1,104 @@
+"""
+Agents fall back to their non-LLM plans when the LLM can't be reached
+"""
+import asyncio
+
+import aiohttp
+import pytest
+import requests
+from yarl import URL
+
+from agents.logistics_coordinator import LogisticsCoordinatorAgent
+from agents.monitor_adaptation import MonitorAdaptationAgent
+from agents.needs_assessment import NeedsAssessmentAgent
+from agents.resource_allocation import ResourceAllocationAgent
+from utils.llm_wrapper import CircuitOpen, MalformedResponse
+from conftest import FailingLLM
+
+
+def _service_unavailable():
+    url = URL('http://stub/api/generate')
+    request_info = aiohttp.RequestInfo(url, 'POST', {}, url)
+    return aiohttp.ClientResponseError(request_info, (), status=503, message='Service Unavailable')
+
+
+ERRORS = [
+    pytest.param(requests.exceptions.ConnectionError('refused'), id='connection'),
+    pytest.param(requests.exceptions.HTTPError('503 Server Error'), id='http-503'),
+    pytest.param(_service_unavailable(), id='aiohttp-503'),
+    pytest.param(asyncio.TimeoutError(), id='timeout'),
+    pytest.param(CircuitOpen('circuit open'), id='circuit-open'),
+    pytest.param(MalformedResponse('Undecodable stream line'), id='malformed-stream'),
+]
+
+
+@pytest.fixture(params=ERRORS)
+def failing_llm(request):
+    return FailingLLM(request.param)
+
+
+def test_needs_assessment_uses_default_assessments(failing_llm, zones):
+    agent = NeedsAssessmentAgent(llm=failing_llm)
+    
+    assessments = agent.assess_all_zones(zones)
+    
+    assert sorted(a['zone_id'] for a in assessments) == sorted(zones['zone_id'])
+    assert all(a['priority_score'] == 50 for a in assessments)
+    assert failing_llm.prompts
+
+
+def test_needs_assessment_async_uses_default_assessments(failing_llm, zones):
+    agent = NeedsAssessmentAgent(llm=failing_llm)
+    
+    assessments = asyncio.run(agent.assess_all_zones_async(zones))
+    
+    assert sorted(a['zone_id'] for a in assessments) == sorted(zones['zone_id'])
+
+
+def _prioritized(zones):
+    return [
+        {'zone_id': zone_id, 'zone_name': name, 'priority_score': 90 - i}
+        for i, (zone_id, name) in enumerate(zip(zones['zone_id'], zones['zone_name']))
+    ]
+
+
+def test_allocation_uses_proportional_fallback(failing_llm, zones, resources):
+    agent = ResourceAllocationAgent(llm=failing_llm)
+    
+    allocations = agent.allocate_resources(_prioritized(zones), resources, max_zones=4)
+    
+    assert [a['zone_id'] for a in allocations] == list(zones['zone_id'][:4])
+    assert all('Proportional allocation' in a['justification'] for a in allocations)
+
+
+def _allocations(zones, resources):
+    agent = ResourceAllocationAgent(llm=FailingLLM(CircuitOpen('down')))
+    return agent.allocate_resources(_prioritized(zones), resources, max_zones=4)
+
+
+def test_logistics_uses_fallback_routes(failing_llm, zones, resources):
+    allocations = _allocations(zones, resources)
+    agent = LogisticsCoordinatorAgent(llm=failing_llm)
+    
+    plan = agent.plan_delivery_routes(allocations, zones)
+    plan_async = asyncio.run(agent.plan_delivery_routes_async(allocations, zones))
+    
+    for delivery_plan in (plan, plan_async):
+        routed = [z for route in delivery_plan['routes'] for z in route['zones_sequence']]
+        assert sorted(routed) == sorted(a['zone_id'] for a in allocations)
+
+
+def test_monitor_uses_fallback_analysis(failing_llm, zones, resources):
+    allocations = _allocations(zones, resources)
+    outcomes = [
+        {'zone_id': a['zone_id'], 'zone_name': a['zone_name'], 'planned_delivery': {},
+         'delivered_percentage': pct, 'challenges': 'none', 'delivery_status': status}
+        for a, pct, status in zip(allocations, (100.0, 90.0, 60.0, 97.0),
+                                  ('complete', 'partial', 'incomplete', 'complete'))
+    ]
+    agent = MonitorAdaptationAgent(llm=failing_llm)
+    
+    analysis = agent.analyze_delivery_outcomes({'routes': []}, outcomes, allocations)
+    
+    assert analysis['zones_fully_served'] == [allocations[0]['zone_id'], allocations[3]['zone_id']]
+    assert analysis['zones_requiring_followup'] == [allocations[2]['zone_id']]
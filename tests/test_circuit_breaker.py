@@ -0,0 +1,106 @@
+"""
+Circuit breaker on LLM requests
+"""
+import asyncio
+import socket
+
+import orjson
+import pytest
+import requests
+
+from utils.llm_wrapper import CircuitOpen, LocalLLM
+
+
+class RefusingSession:
+    """requests.Session stand-in whose POSTs fail until healthy is set"""
+    
+    def __init__(self):
+        self.posts = 0
+        self.healthy = False
+    
+    def post(self, url, **kwargs):
+        self.posts += 1
+        if not self.healthy:
+            raise requests.exceptions.ConnectionError('refused')
+        return OkResponse()
+    
+    def close(self):
+        pass
+
+
+class OkResponse:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def raise_for_status(self):
+        pass
+    
+    def iter_lines(self):
+        yield orjson.dumps({'response': '{"ok": true}', 'done': True})
+
+
+@pytest.fixture
+def session():
+    return RefusingSession()
+
+
+def _llm(session, cooldown=30.0):
+    llm = LocalLLM(model='stub', base_url='http://stub', failure_threshold=2,
+                   cooldown=cooldown, cache_size=0)
+    llm._session = session
+    return llm
+
+
+def test_circuit_opens_after_consecutive_failures(session):
+    llm = _llm(session)
+    
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            llm.invoke('prompt')
+    with pytest.raises(CircuitOpen):
+        llm.invoke('prompt')
+    
+    # Requests are skipped without reaching the server while open
+    assert session.posts == 2
+
+
+def test_success_after_cooldown_closes_the_circuit(session):
+    llm = _llm(session, cooldown=0.0)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            llm.invoke('prompt')
+    
+    session.healthy = True
+    assert llm.invoke('prompt').content == '{"ok": true}'
+    
+    # The failure count starts over
+    session.healthy = False
+    with pytest.raises(requests.exceptions.ConnectionError):
+        llm.invoke('prompt')
+    session.healthy = True
+    assert llm.invoke('prompt').complete
+
+
+def test_async_failures_open_the_circuit():
+    # A port nothing listens on, so connections are refused immediately
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    llm = LocalLLM(model='stub', base_url=f'http://127.0.0.1:{port}', max_retries=0,
+                   failure_threshold=2, cache_size=0)
+    
+    async def run():
+        try:
+            for _ in range(2):
+                with pytest.raises(Exception) as failure:
+                    await llm.ainvoke('prompt')
+                assert not isinstance(failure.value, CircuitOpen)
+            with pytest.raises(CircuitOpen):
+                await llm.ainvoke('prompt')
+        finally:
+            await llm.aclose()
+    
+    asyncio.run(run())
@@ -0,0 +1,23 @@
+"""
+On-disk response cache keys
+"""
+from utils.llm_cache import cache_key
+from utils.llm_wrapper import LocalLLM, VLLMBackend
+
+
+def test_key_separates_backends_and_endpoints():
+    ollama = LocalLLM(model='llama3.1:8b', base_url='http://a:11434')
+    other_host = LocalLLM(model='llama3.1:8b', base_url='http://b:11434')
+    vllm = VLLMBackend(model='llama3.1:8b', base_url='http://a:11434')
+    
+    keys = {cache_key(llm, 'prompt', {'max_tokens': 64}) for llm in (ollama, other_host, vllm)}
+    
+    assert len(keys) == 3
+
+
+def test_key_is_stable_for_the_same_configuration():
+    first = LocalLLM(model='llama3.1:8b', base_url='http://a:11434')
+    second = LocalLLM(model='llama3.1:8b', base_url='http://a:11434')
+    
+    assert cache_key(first, 'prompt', {'b': 1, 'a': 2}) == cache_key(second, 'prompt', {'a': 2, 'b': 1})
+    assert cache_key(first, 'prompt') != cache_key(first, 'other prompt')
@@ -0,0 +1,102 @@
+"""
+LLM pool routing and shutdown
+"""
+import asyncio
+
+import orjson
+import pytest
+
+from core.llm_pool import LLMPool
+from core.orchestrator import HumanitarianAIOrchestrator
+from utils.llm_wrapper import CircuitOpen
+from conftest import FailingLLM, StubLLM
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Pool from LLM_ENDPOINTS with a "fast" and a "reasoning" group"""
+    endpoints = [
+        {'url': 'http://127.0.0.1:9', 'group': 'fast'},
+        {'url': 'http://127.0.0.1:10', 'group': 'reasoning'},
+    ]
+    monkeypatch.setenv('LLM_ENDPOINTS', orjson.dumps(endpoints).decode())
+    monkeypatch.setattr(LLMPool, '_from_env', None)
+    return LLMPool.from_env()
+
+
+def test_orchestrator_closes_each_endpoint_once(pool, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    closed = []
+    for group in ('fast', 'reasoning'):
+        for endpoint in pool.endpoints(group):
+            async def aclose(llm=endpoint.llm):
+                closed.append(llm.base_url)
+            monkeypatch.setattr(endpoint.llm, 'aclose', aclose)
+    
+    orchestrator = HumanitarianAIOrchestrator(num_zones=6)
+    asyncio.run(orchestrator.aclose())
+    
+    assert sorted(closed) == ['http://127.0.0.1:10', 'http://127.0.0.1:9']
+
+
+def test_pooled_client_close_leaves_the_pool_open(pool, monkeypatch):
+    closed = []
+    for endpoint in pool.endpoints('fast'):
+        monkeypatch.setattr(endpoint.llm, 'close', lambda: closed.append('sync'))
+    
+    client = pool.client('fast')
+    client.close()
+    asyncio.run(client.aclose())
+    
+    assert closed == []
+
+
+@pytest.fixture
+def pair():
+    """Pool with two endpoints in one group, answered by stub clients"""
+    pool = LLMPool([{'url': 'http://127.0.0.1:11'}, {'url': 'http://127.0.0.1:12'}],
+                   failure_threshold=1, cooldown=0.0)
+    return pool, pool.endpoints('default')
+
+
+def test_transport_errors_fail_over_and_count(pair):
+    pool, (first, second) = pair
+    first.llm = FailingLLM(CircuitOpen('down'))
+    second.llm = StubLLM(lambda prompt: 'ok')
+    first.ewma_latency, second.ewma_latency = 0.1, 1.0
+    
+    assert pool.invoke('prompt').content == 'ok'
+    assert first.failures == 1 and first.opened_at is not None
+    assert second.failures == 0
+
+
+def test_programming_errors_are_not_retried_or_counted(pair):
+    pool, (first, second) = pair
+    first.llm = FailingLLM(TypeError('unexpected keyword'))
+    second.llm = FailingLLM(TypeError('unexpected keyword'))
+    
+    with pytest.raises(TypeError):
+        pool.invoke('prompt')
+    
+    assert len(first.llm.prompts) + len(second.llm.prompts) == 1
+    assert first.failures == second.failures == 0
+    assert first.in_flight == second.in_flight == 0
+
+
+def test_half_open_endpoint_admits_one_probe(pair):
+    pool, (first, second) = pair
+    for endpoint in (first, second):
+        endpoint.llm = StubLLM(lambda prompt: 'ok')
+        endpoint.failures, endpoint.opened_at = 1, 0.0
+    
+    # While a probe is out on every endpoint, requests aren't sent anywhere
+    first.probing = second.probing = True
+    with pytest.raises(CircuitOpen):
+        pool.invoke('prompt')
+    assert first.llm.prompts == second.llm.prompts == []
+    
+    # A successful probe puts the endpoint back into rotation
+    second.probing = False
+    assert pool.invoke('prompt').content == 'ok'
+    assert second.opened_at is None and not second.probing
+    assert first.opened_at is not None
@@ -0,0 +1,164 @@
+"""
+Streaming early stop, prose-tolerant parsing and response caching
+"""
+import orjson
+import pytest
+
+from utils.llm_cache import cached_invoke
+from utils.llm_parse import JSONEndScanner, parse_llm_json
+from utils.llm_wrapper import CircuitOpen, LocalLLM, MalformedResponse
+
+PAYLOAD = {"priority_score": 80, "critical_needs": ["food"], "reasoning": "a {b} [c]"}
+PROSE_REPLY = f"Sure! Here is the result {{as requested}}: {orjson.dumps(PAYLOAD).decode()}"
+
+
+class FakeStreamResponse:
+    """Ollama NDJSON stream of text, seven characters per line"""
+    
+    def __init__(self, text):
+        self.lines = [
+            orjson.dumps({'response': text[i:i + 7], 'done': False})
+            for i in range(0, len(text), 7)
+        ] + [orjson.dumps({'response': '', 'done': True})]
+        self.lines_read = 0
+    
+    @classmethod
+    def truncated(cls, text):
+        """Stream cut off in the middle of its second line"""
+        response = cls(text)
+        response.lines[1] = response.lines[1][:-4]
+        return response
+    
+    @classmethod
+    def single_chunk(cls, text):
+        """Stream whose only line carries all of text and ends generation"""
+        response = cls('')
+        response.lines = [orjson.dumps({'response': text, 'done': True})]
+        return response
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def raise_for_status(self):
+        pass
+    
+    def iter_lines(self):
+        for line in self.lines:
+            self.lines_read += 1
+            yield line
+
+
+class FakeSession:
+    """requests.Session stand-in replying to every POST with the same text"""
+    
+    def __init__(self, text, stream=FakeStreamResponse):
+        self.text = text
+        self.stream = stream
+        self.responses = []
+    
+    def post(self, url, json=None, **kwargs):
+        self.responses.append(self.stream(self.text))
+        return self.responses[-1]
+
+
+@pytest.fixture
+def make_llm():
+    def make(text):
+        llm = LocalLLM(model='stub', base_url='http://stub')
+        llm._session = FakeSession(text)
+        return llm
+    return make
+
+
+def test_scanner_skips_bracketed_prose():
+    scanner = JSONEndScanner()
+    
+    assert not scanner.feed("Sure! Here is the result {as requested}: ")
+    assert scanner.feed(orjson.dumps(PAYLOAD).decode() + " and more")
+    assert scanner.value == PAYLOAD
+
+
+def test_scanner_ignores_brackets_inside_strings():
+    scanner = JSONEndScanner()
+    
+    assert scanner.feed('[{"text": "} ]"}, 2]')
+    assert scanner.value == [{"text": "} ]"}, 2]
+
+
+def test_parse_llm_json_recovers_from_bracketed_prose():
+    assert parse_llm_json(PROSE_REPLY + " Hope this helps {really}!") == PAYLOAD
+
+
+def test_invoke_stops_after_json_value(make_llm):
+    llm = make_llm(orjson.dumps(PAYLOAD).decode() + " TRAILING PROSE " * 20)
+    
+    response = llm.invoke('prompt')
+    
+    assert parse_llm_json(response.content) == PAYLOAD
+    stream = llm._session.responses[0]
+    assert stream.lines_read < len(stream.lines)
+
+
+def test_invoke_does_not_stop_at_bracketed_prose(make_llm):
+    llm = make_llm(PROSE_REPLY)
+    
+    response = llm.invoke('prompt')
+    
+    assert response.complete
+    assert parse_llm_json(response.content) == PAYLOAD
+
+
+def test_incomplete_response_is_not_memoized(make_llm):
+    llm = make_llm('{"priority_score": 80, "critical_needs": ["fo')
+    
+    first = llm.invoke('prompt')
+    llm.invoke('prompt')
+    
+    assert not first.complete
+    assert len(llm._session.responses) == 2
+
+
+def test_complete_response_is_memoized(make_llm):
+    llm = make_llm(PROSE_REPLY)
+    
+    llm.invoke('prompt')
+    llm.invoke('prompt')
+    
+    assert len(llm._session.responses) == 1
+
+
+def test_incomplete_response_is_not_stored_on_disk(make_llm, monkeypatch, tmp_path):
+    monkeypatch.setenv('LLM_CACHE', '1')
+    monkeypatch.setenv('LLM_CACHE_DIR', str(tmp_path))
+    
+    cached_invoke(make_llm('no json here {at all'), 'prompt', use_cache=False)
+    assert not list(tmp_path.iterdir())
+    
+    cached_invoke(make_llm(PROSE_REPLY), 'prompt', use_cache=False)
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_json_closed_by_the_final_chunk_is_complete(make_llm):
+    llm = make_llm(PROSE_REPLY)
+    llm._session.stream = FakeStreamResponse.single_chunk
+    
+    first = llm.invoke('prompt')
+    llm.invoke('prompt')
+    
+    assert first.complete
+    assert len(llm._session.responses) == 1
+
+
+def test_truncated_stream_line_is_a_failed_request(make_llm):
+    llm = make_llm(PROSE_REPLY)
+    llm._session.stream = FakeStreamResponse.truncated
+    llm.failure_threshold = 2
+    
+    for _ in range(2):
+        with pytest.raises(MalformedResponse):
+            llm.invoke('prompt')
+    with pytest.raises(CircuitOpen):
+        llm.invoke('prompt')
@@ -0,0 +1,75 @@
+"""
+Batched needs assessment: one request for every zone
+"""
+import asyncio
+
+import orjson
+
+from agents.needs_assessment import NeedsAssessmentAgent
+from conftest import StubLLM
+
+
+def _score(zone_id):
+    return 40 + int(zone_id[1:]) * 5
+
+
+def _assessment(zone_id):
+    return {'zone_id': zone_id, 'priority_score': _score(zone_id), 'critical_needs': ['water'],
+            'vulnerability_score': 10, 'shortage_score': 20, 'time_score': 5,
+            'reasoning': 'stub'}
+
+
+def _batch_llm(zone_ids, single='{}'):
+    """Answers the batch prompt with one assessment per zone, the rest with single"""
+    reply = orjson.dumps([_assessment(z) for z in zone_ids]).decode()
+    return StubLLM(lambda prompt: reply if 'ZONES DATA' in prompt else single)
+
+
+def test_all_zones_assessed_with_one_request(zones):
+    llm = _batch_llm(list(zones['zone_id']))
+    agent = NeedsAssessmentAgent(llm=llm)
+    
+    assessments = agent.assess_all_zones(zones)
+    
+    assert len(llm.prompts) == 1
+    assert [a['priority_score'] for a in assessments] == \
+        sorted((_score(z) for z in zones['zone_id']), reverse=True)
+
+
+def test_incomplete_batch_falls_back_to_per_zone_requests(zones):
+    zone_ids = list(zones['zone_id'])
+    single = orjson.dumps(_assessment('Z00')).decode()
+    llm = _batch_llm(zone_ids[:-1], single)
+    agent = NeedsAssessmentAgent(llm=llm)
+    
+    sync = agent.assess_all_zones(zones)
+    asynchronous = asyncio.run(agent.assess_all_zones_async(zones))
+    
+    assert len(llm.prompts) == 2 * (1 + len(zone_ids))
+    for assessments in (sync, asynchronous):
+        assert sorted(a['zone_id'] for a in assessments) == sorted(zone_ids)
+
+
+def test_reordered_batch_is_joined_on_zone_id(zones):
+    zone_ids = list(zones['zone_id'])
+    llm = _batch_llm(list(reversed(zone_ids)))
+    agent = NeedsAssessmentAgent(llm=llm)
+    records = zones.to_dict('records')
+    
+    assessments = agent.assess_zones_batch(records)
+    
+    assert [a['zone_id'] for a in assessments] == zone_ids
+    assert [a['priority_score'] for a in assessments] == [_score(z) for z in zone_ids]
+    assert [a['zone_name'] for a in assessments] == list(zones['zone_name'])
+
+
+def test_batch_prompt_sends_only_scored_fields(zones):
+    llm = _batch_llm(list(zones['zone_id']))
+    agent = NeedsAssessmentAgent(llm=llm)
+    
+    agent.assess_zones_batch(zones.to_dict('records'))
+    
+    prompt = llm.prompts[0]
+    assert '"food_shortage"' in prompt and '"zone_id"' in prompt
+    for unscored in ('zone_name', 'latitude', 'road_condition', 'security_level'):
+        assert f'"{unscored}"' not in prompt
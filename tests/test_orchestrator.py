@@ -0,0 +1,105 @@
+"""
+Orchestrator cycles: simulated deliveries and concurrent runs
+"""
+import asyncio
+
+from core.orchestrator import CHALLENGE_MULTIPLIERS, CHALLENGE_PROBS, CHALLENGES
+
+
+def _outcomes(results):
+    return {
+        r['cycle_number']: [
+            (o['zone_id'], o['delivered_percentage'], o['challenges'])
+            for o in r['delivery_outcomes']['actual_results']
+        ]
+        for r in results
+    }
+
+
+def test_delivery_simulation_is_repeatable_per_cycle(orchestrator):
+    allocations = [{'zone_id': f'Z{i:02d}', 'zone_name': 'S', 'food_packages': 10}
+                   for i in range(1, 6)]
+    
+    first = orchestrator._simulate_delivery_execution(allocations, cycle_number=2)
+    orchestrator._simulate_delivery_execution(allocations, cycle_number=1)
+    again = orchestrator._simulate_delivery_execution(allocations, cycle_number=2)
+    
+    assert first == again
+    assert all(o['challenges'] in CHALLENGES for o in first)
+
+
+def test_delivery_simulation_matches_per_delivery_rules(orchestrator):
+    allocations = [
+        {'zone_id': f'Z{i:02d}', 'zone_name': 'S', 'priority_score': 80,
+         'justification': 'j', 'food_packages': i}
+        for i in range(200)
+    ]
+    
+    outcomes = orchestrator._simulate_delivery_execution(allocations, cycle_number=4)
+    
+    # Same draws, applied one delivery at a time
+    rng = orchestrator.simulator.delivery_rng(4)
+    base = rng.uniform(0.85, 1.0, len(allocations))
+    challenges = rng.choice(len(CHALLENGES), size=len(allocations), p=CHALLENGE_PROBS)
+    for i, outcome in enumerate(outcomes):
+        rate = base[i] * CHALLENGE_MULTIPLIERS[challenges[i]]
+        status = 'complete' if rate >= 0.95 else 'partial' if rate >= 0.75 else 'incomplete'
+        assert outcome == {
+            'zone_id': f'Z{i:02d}',
+            'zone_name': 'S',
+            'planned_delivery': {'food_packages': i},
+            'delivered_percentage': round(rate * 100, 1),
+            'challenges': CHALLENGES[challenges[i]],
+            'delivery_status': status,
+        }
+    assert {o['delivery_status'] for o in outcomes} == {'complete', 'partial', 'incomplete'}
+
+
+def test_concurrent_cycles_match_serial_results(orchestrator, monkeypatch, tmp_path):
+    serial = asyncio.run(orchestrator.run_multiple_cycles_async(
+        num_cycles=3, max_zones_per_cycle=4, max_concurrent_cycles=1
+    ))
+    concurrent = asyncio.run(orchestrator.run_multiple_cycles_async(
+        num_cycles=3, max_zones_per_cycle=4, max_concurrent_cycles=3
+    ))
+    
+    assert _outcomes(serial) == _outcomes(concurrent)
+    assert [r['available_resources'] for r in serial] == \
+        [r['available_resources'] for r in concurrent]
+    assert [c['cycle_number'] for c in orchestrator.cycle_history] == [1, 1, 2, 2, 3, 3]
+
+
+def test_zone_snapshot_written_once_next_to_cycle_outputs(orchestrator, tmp_path):
+    from utils.visualization import HumanitarianDashboard
+    
+    asyncio.run(orchestrator.run_multiple_cycles_async(
+        num_cycles=3, max_zones_per_cycle=4, max_concurrent_cycles=1
+    ))
+    
+    snapshots = list((tmp_path / 'outputs').rglob('zones_snapshot*'))
+    assert len(snapshots) == 1
+    assert snapshots[0].parent.parent == tmp_path / 'outputs'
+    
+    # Saved cycles don't embed the records and read the shared snapshot
+    manifests = sorted((tmp_path / 'outputs').glob('cycle_3_*/manifest.json*'))
+    dashboard = HumanitarianDashboard(str(manifests[0]))
+    assert 'zones_data' not in dashboard.data['settlement_data']
+    assert len(dashboard.zones_df) == len(orchestrator.simulator.zones)
+
+
+def test_route_map_from_unsaved_later_cycle(orchestrator, tmp_path):
+    from utils.visualization import HumanitarianDashboard
+    
+    results = asyncio.run(orchestrator.run_multiple_cycles_async(
+        num_cycles=2, max_zones_per_cycle=4, max_concurrent_cycles=2
+    ))
+    
+    # Saving strips the records from the manifest, not from the results
+    for cycle in results:
+        dashboard = HumanitarianDashboard(cycle)
+        dashboard.create_route_map(str(tmp_path / f"route_map_{cycle['cycle_number']}.html"))
+        assert len(dashboard.zones_df) == len(orchestrator.simulator.zones)
+    
+    fresh = orchestrator.run_distribution_cycle(cycle_number=2, max_zones_to_serve=4)
+    HumanitarianDashboard(fresh).create_route_map(str(tmp_path / 'route_map.html'))
+    assert (tmp_path / 'route_map.html').exists()
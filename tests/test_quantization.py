@@ -0,0 +1,24 @@
+"""
+Model tags requested for each weight precision
+"""
+from utils.llm_wrapper import LocalLLM, VLLMBackend, quantized_model
+
+
+def test_default_model_is_the_plain_tag(monkeypatch):
+    monkeypatch.delenv('OLLAMA_MODEL', raising=False)
+    
+    assert LocalLLM().model == 'llama3.2:3b'
+
+
+def test_quantization_is_opt_in(monkeypatch):
+    monkeypatch.delenv('OLLAMA_MODEL', raising=False)
+    
+    assert LocalLLM(quantization='int4').model == 'llama3.2:3b-instruct-q4_K_M'
+    assert LocalLLM(quantization='int8').model == 'llama3.2:3b-instruct-q8_0'
+    assert LocalLLM(model='llama3.1:8b', quantization='fp16').model == 'llama3.1:8b-instruct-fp16'
+
+
+def test_tags_naming_a_precision_are_left_alone():
+    assert quantized_model('llama3.2:3b-instruct-q8_0', 'int4') == 'llama3.2:3b-instruct-q8_0'
+    assert quantized_model('llama3.2', 'int4') == 'llama3.2'
+    assert VLLMBackend(model='org/model', quantization='int4').model == 'org/model'
@@ -0,0 +1,49 @@
+"""
+Allocation validation and the rank-proportional fallback
+"""
+import pytest
+
+from agents.resource_allocation import ResourceAllocationAgent
+from conftest import StubLLM
+
+
+@pytest.fixture
+def agent():
+    return ResourceAllocationAgent(llm=StubLLM())
+
+
+def test_overallocated_resources_are_scaled_down(agent):
+    allocations = [
+        {'zone_id': 'Z01', 'food_packages': 300, 'water_liters': 100, 'blankets': 7},
+        {'zone_id': 'Z02', 'food_packages': 100, 'water_liters': 50},
+    ]
+    available = {'food_packages': 200, 'water_liters': 1000}
+    
+    validated = agent._validate_allocations(allocations, available)
+    
+    # Food is halved; water fits and blankets aren't stocked, so both stay
+    assert [a['food_packages'] for a in validated] == [150, 50]
+    assert [a['water_liters'] for a in validated] == [100, 50]
+    assert validated[0]['blankets'] == 7
+    assert 'blankets' not in validated[1]
+    assert sum(a['food_packages'] for a in validated) <= available['food_packages']
+
+
+def test_allocations_within_capacity_are_unchanged(agent, resources):
+    allocations = [{'zone_id': 'Z01', 'food_packages': 1, 'medical_kits': 1}]
+    
+    assert agent._validate_allocations(allocations, resources) == \
+        [{'zone_id': 'Z01', 'food_packages': 1, 'medical_kits': 1}]
+
+
+def test_fallback_allocation_is_rank_proportional(agent):
+    zones = [{'zone_id': f'Z0{i}', 'priority_score': 90 - i} for i in range(1, 4)]
+    available = {'food_packages': 600, 'water_liters': 0, 'medical_kits': 60,
+                 'shelter_materials': 6}
+    
+    allocations = agent._create_fallback_allocation(zones, available)
+    
+    # Ranks 1-3 receive 3/6, 2/6 and 1/6 of 90% of each resource
+    assert [a['food_packages'] for a in allocations] == [270, 180, 90]
+    assert [a['medical_kits'] for a in allocations] == [27, 18, 9]
+    assert all(a['water_liters'] == 0 for a in allocations)
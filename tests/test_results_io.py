@@ -0,0 +1,51 @@
+"""
+Cycle results saved as a manifest plus JSON Lines sections, and read back
+"""
+import os
+
+import numpy as np
+import pytest
+
+from utils.json_utils import RESULT_SECTIONS, read_json, write_json, write_jsonl
+from utils.visualization import HumanitarianDashboard
+
+
+@pytest.fixture(params=['1', '0'], ids=['zstd', 'plain'])
+def compress(request, monkeypatch):
+    monkeypatch.setenv('RESULTS_COMPRESS', request.param)
+    return request.param == '1'
+
+
+def test_json_round_trip_with_numpy_values(compress, tmp_path):
+    obj = {'count': np.int64(3), 'scores': np.array([1.5, 2.0]), 'flag': np.bool_(True)}
+    
+    path = write_json(obj, str(tmp_path / 'obj.json'))
+    
+    assert path.endswith('.zst') == compress
+    assert read_json(path) == {'count': 3, 'scores': [1.5, 2.0], 'flag': True}
+
+
+def test_jsonl_writes_one_record_per_line(monkeypatch, tmp_path):
+    monkeypatch.setenv('RESULTS_COMPRESS', '0')
+    records = [{'zone_id': 'Z01', 'n': np.int32(1)}, {'zone_id': 'Z02', 'n': 2}]
+    
+    path = write_jsonl(records, str(tmp_path / 'records.jsonl'))
+    
+    with open(path) as f:
+        assert f.read().splitlines() == ['{"zone_id":"Z01","n":1}', '{"zone_id":"Z02","n":2}']
+
+
+def test_saved_cycle_reads_back_section_by_section(compress, orchestrator, tmp_path):
+    results = orchestrator.run_distribution_cycle(cycle_number=1, max_zones_to_serve=4)
+    
+    manifest_path = orchestrator.save_results(results, output_dir=str(tmp_path / 'out'))
+    
+    assert manifest_path.endswith('.zst') == compress
+    dashboard = HumanitarianDashboard(manifest_path)
+    for stem, (section, key) in RESULT_SECTIONS.items():
+        assert key not in dashboard.data[section]
+        assert os.path.exists(os.path.join(dashboard.results_dir, dashboard.data['sections'][stem]))
+        frame = dashboard._section_df(stem)
+        assert list(frame['zone_id']) == [r['zone_id'] for r in results[section][key]]
+    assert dashboard.data['cycle_number'] == results['cycle_number']
+
@@ -0,0 +1,103 @@
+"""
+Fallback route planning kernels and the zone logistics they use
+"""
+import numpy as np
+import pytest
+
+from agents._routing_core import (
+    fallback_routes, route_distance_matrix, tour_length, two_opt,
+)
+from agents.logistics_coordinator import LogisticsCoordinatorAgent
+from conftest import StubLLM
+
+
+def _zone(zone_id, lat, lon, distance):
+    return {'zone_id': zone_id, 'latitude': lat, 'longitude': lon,
+            'distance_from_depot': distance}
+
+
+def test_distance_matrix_is_great_circle_km():
+    dists = route_distance_matrix([1.0, 0.0], [0.0, 1.0], depot=(0.0, 0.0))
+    
+    assert dists.shape == (3, 3)
+    np.testing.assert_allclose(np.diag(dists), 0, atol=1e-3)
+    np.testing.assert_allclose(dists, dists.T)
+    # One degree of latitude or of longitude on the equator is ~111.2 km
+    assert dists[0, 1] == pytest.approx(111.2, abs=0.1)
+    assert dists[0, 2] == pytest.approx(111.2, abs=0.1)
+    assert dists[1, 2] == pytest.approx(157.2, abs=0.1)
+
+
+def _euclidean(points):
+    points = np.asarray(points, dtype=np.float32)
+    return np.linalg.norm(points[:, None] - points[None, :], axis=-1)
+
+
+def test_two_opt_untangles_crossing_tour():
+    # Depot plus three corners of a unit square, visited along both diagonals
+    dists = _euclidean([(0, 0), (0, 1), (1, 1), (1, 0)])
+    crossing = np.array([0, 2, 1, 3], dtype=np.int32)
+    
+    improved = two_opt(crossing, dists)
+    
+    assert improved[0] == 0
+    assert sorted(improved) == [0, 1, 2, 3]
+    assert tour_length(crossing, dists) == pytest.approx(2 + 2 * np.sqrt(2))
+    assert tour_length(improved, dists) == pytest.approx(4.0)
+
+
+def test_two_opt_keeps_optimal_tour():
+    dists = _euclidean([(0, 0), (0, 1), (1, 1), (1, 0)])
+    perimeter = np.array([0, 1, 2, 3], dtype=np.int32)
+    
+    np.testing.assert_array_equal(two_opt(perimeter, dists), perimeter)
+
+
+def test_fallback_routes_order_stops_by_location():
+    # Allocation order zig-zags across the depot; the tour must not
+    zone_logistics = [
+        _zone('Z01', 0.0, -2.0, 12.0),
+        _zone('Z02', 0.0, 2.0, 8.0),
+        _zone('Z03', 0.0, -1.0, 5.0),
+    ]
+    allocations = [{'zone_id': zl['zone_id']} for zl in zone_logistics]
+    
+    routes = fallback_routes(allocations, zone_logistics)
+    
+    assert len(routes) == 1
+    sequence = routes[0]['zones_sequence']
+    assert sorted(sequence) == ['Z01', 'Z02', 'Z03']
+    # West-side stops are visited back to back
+    assert abs(sequence.index('Z01') - sequence.index('Z03')) == 1
+
+
+def test_fallback_routes_report_summed_depot_distances():
+    zone_logistics = [_zone(f'Z0{i}', 30 + i * 0.1, 40 - i * 0.1, d)
+                      for i, d in enumerate((3.0, 7.5, 4.0, 12.0))]
+    allocations = [{'zone_id': zl['zone_id']} for zl in zone_logistics]
+    
+    routes = fallback_routes(allocations, zone_logistics)
+    
+    assert [r['total_distance_km'] for r in routes] == [14.5, 12.0]
+    assert [r['estimated_time_hours'] for r in routes] == [2.5, 2.4]
+
+
+def test_fallback_routes_place_unknown_zones_at_depot():
+    zone_logistics = [_zone('Z01', 30.0, 40.0, 6.0)]
+    allocations = [{'zone_id': 'Z01'}, {'zone_id': 'Z99'}]
+    
+    routes = fallback_routes(allocations, zone_logistics)
+    
+    assert sorted(routes[0]['zones_sequence']) == ['Z01', 'Z99']
+    assert routes[0]['total_distance_km'] == 16.0
+
+
+def test_route_prompt_accepts_a_range_indexed_frame(zones):
+    agent = LogisticsCoordinatorAgent(llm=StubLLM())
+    allocations = [{'zone_id': 'Z03'}, {'zone_id': 'Z01'}]
+    
+    _, by_id = agent._route_prompt(allocations, zones)
+    _, by_position = agent._route_prompt(allocations, zones.reset_index(drop=True))
+    
+    assert [z['zone_id'] for z in by_position] == ['Z03', 'Z01']
+    assert by_position == by_id
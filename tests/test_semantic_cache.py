@@ -0,0 +1,116 @@
+"""
+Allocation plans reused from the semantic cache
+"""
+import orjson
+import pytest
+
+from agents.resource_allocation import ResourceAllocationAgent
+from conftest import StubLLM
+
+
+@pytest.fixture
+def semantic_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv('SEMANTIC_CACHE', '1')
+    monkeypatch.setenv('LLM_CACHE_DIR', str(tmp_path / 'llm'))
+    return tmp_path
+
+
+@pytest.fixture
+def prioritized(zones):
+    return [
+        {'zone_id': zone_id, 'zone_name': name, 'priority_score': 90 - 5 * i}
+        for i, (zone_id, name) in enumerate(zip(zones['zone_id'], zones['zone_name']))
+    ]
+
+
+def _allocation_llm(prioritized):
+    plan = [
+        {'zone_id': z['zone_id'], 'zone_name': z['zone_name'],
+         'priority_score': z['priority_score'], 'food_packages': 100, 'water_liters': 300,
+         'medical_kits': 5, 'shelter_materials': 2, 'blankets': 20, 'hygiene_kits': 10,
+         'justification': 'stub'}
+        for z in prioritized[:4]
+    ]
+    return StubLLM(lambda prompt: orjson.dumps(plan).decode())
+
+
+def test_same_request_reuses_plan(semantic_cache_dir, prioritized, resources):
+    llm = _allocation_llm(prioritized)
+    agent = ResourceAllocationAgent(llm=llm)
+    
+    agent.allocate_resources(prioritized, resources, max_zones=4)
+    agent.allocate_resources(prioritized, resources, max_zones=4)
+    
+    assert len(llm.prompts) == 1
+
+
+def test_doubled_resources_miss_the_cache(semantic_cache_dir, prioritized, resources):
+    llm = _allocation_llm(prioritized)
+    agent = ResourceAllocationAgent(llm=llm)
+    doubled = {k: v * 2 for k, v in resources.items()}
+    
+    agent.allocate_resources(prioritized, resources, max_zones=4)
+    agent.allocate_resources(prioritized, doubled, max_zones=4)
+    
+    assert len(llm.prompts) == 2
+
+
+def test_single_resource_change_misses_the_cache(semantic_cache_dir, prioritized, resources):
+    llm = _allocation_llm(prioritized)
+    agent = ResourceAllocationAgent(llm=llm)
+    halved_water = dict(resources, water_liters=resources['water_liters'] // 2)
+    
+    agent.allocate_resources(prioritized, resources, max_zones=4)
+    agent.allocate_resources(prioritized, halved_water, max_zones=4)
+    
+    assert len(llm.prompts) == 2
+
+
+def test_large_priority_change_in_one_zone_misses_the_cache(semantic_cache_dir, prioritized,
+                                                            resources):
+    llm = _allocation_llm(prioritized)
+    agent = ResourceAllocationAgent(llm=llm)
+    dropped = [dict(z) for z in prioritized]
+    dropped[1]['priority_score'] = 60
+    
+    agent.allocate_resources(prioritized, resources, max_zones=4)
+    agent.allocate_resources(dropped, resources, max_zones=4)
+    
+    assert len(llm.prompts) == 2
+
+
+def test_small_priority_changes_reuse_the_plan(semantic_cache_dir, prioritized, resources):
+    llm = _allocation_llm(prioritized)
+    agent = ResourceAllocationAgent(llm=llm)
+    nudged = [dict(z, priority_score=z['priority_score'] - 4) for z in prioritized]
+    
+    agent.allocate_resources(prioritized, resources, max_zones=4)
+    agent.allocate_resources(nudged, resources, max_zones=4)
+    
+    assert len(llm.prompts) == 1
+
+
+def test_key_separates_resources_from_priorities(prioritized, resources):
+    agent = ResourceAllocationAgent(llm=StubLLM())
+    
+    signature, key_vec = agent._semantic_key(prioritized[:4], resources)
+    doubled_signature, doubled_vec = agent._semantic_key(
+        prioritized[:4], {k: v * 2 for k, v in resources.items()}
+    )
+    
+    assert signature != doubled_signature
+    assert list(key_vec) == list(doubled_vec)
+
+
+@pytest.mark.parametrize('contents', [b'', b'\x80\x05garbage', b'not a pickle at all'])
+def test_unreadable_cache_file_starts_empty(semantic_cache_dir, contents):
+    from utils.semantic_cache import SemanticCache
+    
+    path = semantic_cache_dir / 'broken.semantic-v2.pkl'
+    path.write_bytes(contents)
+    cache = SemanticCache('broken')
+    
+    assert cache.lookup(('sig',), [1.0, 0.0]) is None
+    cache.store(('sig',), [1.0, 0.0], 'plan')
+    assert SemanticCache('broken').lookup(('sig',), [1.0, 0.0]) == 'plan'
+    assert not list(semantic_cache_dir.glob('*.tmp'))
@@ -0,0 +1,47 @@
+"""
+Per-cycle resources and cached settlement totals
+"""
+from data.settlement_data import RESOURCE_RANGES, SettlementSimulator
+
+
+def test_cycle_resources_are_drawn_once(simulator):
+    first = simulator.get_available_resources('normal', cycle=2)
+    again = simulator.get_available_resources('normal', cycle=2)
+    
+    assert first == again
+    assert simulator._resources_for.cache_info().misses == 1
+    assert simulator._resources_for.cache_info().hits == 1
+
+
+def test_memoized_resources_cannot_be_modified_by_callers(simulator):
+    resources = simulator.get_available_resources('normal', cycle=3)
+    expected = dict(resources)
+    resources['food_packages'] = 0
+    
+    assert simulator.get_available_resources('normal', cycle=3) == expected
+
+
+def test_cycle_resources_do_not_depend_on_other_draws():
+    fresh = SettlementSimulator(num_zones=6)
+    used = SettlementSimulator(num_zones=6)
+    used.get_available_resources('scarce')
+    used.get_available_resources('normal', cycle=1)
+    
+    assert used.get_available_resources('normal', cycle=5) == \
+        fresh.get_available_resources('normal', cycle=5)
+    assert fresh.get_available_resources('normal', cycle=5) != \
+        fresh.get_available_resources('normal', cycle=6)
+
+
+def test_scenario_scales_supplies_but_not_staff(simulator):
+    normal = simulator.get_available_resources('normal', cycle=1)
+    scarce = simulator.get_available_resources('scarce', cycle=1)
+    
+    assert scarce['food_packages'] == int(normal['food_packages'] * 0.6)
+    assert scarce['vehicles_available'] == normal['vehicles_available']
+    assert set(normal) == set(RESOURCE_RANGES)
+
+
+def test_total_population_matches_zones(simulator):
+    assert simulator.total_population == int(simulator.zones['population'].sum())
+    assert sum(simulator.population_by_zone.values()) == simulator.total_population
@@ -0,0 +1,49 @@
+"""
+vLLM list requests: one round trip per batch, with the in-memory cache
+"""
+import asyncio
+
+import pytest
+
+from utils.llm_cache import cached_batch_ainvoke
+from utils.llm_wrapper import VLLMBackend
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    llm = VLLMBackend(model='stub', base_url='http://stub')
+    llm.payloads = []
+    
+    async def apost(payload, read=None):
+        llm.payloads.append(payload)
+        # Answer out of order; choices carry their prompt's index
+        return {'choices': [
+            {'index': i, 'text': f'answer to {prompt}'}
+            for i, prompt in reversed(list(enumerate(payload['prompt'])))
+        ]}
+    
+    monkeypatch.setattr(llm, '_apost', apost)
+    return llm
+
+
+def test_batch_is_one_request_in_prompt_order(llm):
+    responses = asyncio.run(llm.batch_invoke(['a', 'b', 'c'], max_tokens=64, temperature=0.0))
+    
+    assert [r.content for r in responses] == ['answer to a', 'answer to b', 'answer to c']
+    assert len(llm.payloads) == 1
+    assert llm.payloads[0]['max_tokens'] == 64
+
+
+def test_recent_prompts_are_answered_from_memory(llm):
+    asyncio.run(llm.batch_invoke(['a', 'b'], max_tokens=64))
+    responses = asyncio.run(llm.batch_invoke(['b', 'c', 'a'], max_tokens=64))
+    
+    assert [r.content for r in responses] == ['answer to b', 'answer to c', 'answer to a']
+    assert llm.payloads[1]['prompt'] == ['c']
+
+
+def test_use_cache_is_accepted_through_the_disk_cache_layer(llm):
+    asyncio.run(cached_batch_ainvoke(llm, ['a'], max_tokens=64))
+    asyncio.run(cached_batch_ainvoke(llm, ['a'], max_tokens=64, use_cache=False))
+    
+    assert [p['prompt'] for p in llm.payloads] == [['a'], ['a']]
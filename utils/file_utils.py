@@ -0,0 +1,24 @@
+"""
+File helpers - writes that readers never observe half-done
+"""
+import os
+import threading
+from pathlib import Path
+
+
+def atomic_write(path, data):
+    """
+    Write bytes to path via a temp file and a rename
+
+    Concurrent readers (other threads or processes) see either the old
+    file or the complete new one, never a partial write.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
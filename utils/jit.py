@@ -0,0 +1,29 @@
+"""
+JIT helpers - optional Numba acceleration for numeric kernels
+
+Kernels are compiled with Numba when it is installed. Kernels declared with
+cache=True persist the compiled machine code next to their module, so only
+the very first run pays the compilation cost.
+"""
+import os
+
+try:
+    import numba
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+    
+    # Parallel kernels also run from worker threads (asyncio.to_thread);
+    # the TBB layer can hang interpreter shutdown when first launched
+    # there, so only fall back to it if nothing else is available
+    if 'NUMBA_THREADING_LAYER_PRIORITY' not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ['omp', 'workqueue', 'tbb']
+except ImportError:
+    # Numba is optional; kernels run as plain Python without it
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -0,0 +1,92 @@
+"""
+JSON helpers - fast orjson-based serialization
+"""
+import os
+import orjson
+import zstandard as zstd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Indented output with native support for numpy scalars and arrays;
+# numpy string keys (e.g. from np.random.choice) are str subclasses
+PROMPT_JSON_OPTIONS = (orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                       | orjson.OPT_NON_STR_KEYS)
+
+# Result files are read by code, so they are written compact
+RESULTS_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+ZSTD_LEVEL = 3
+
+# Per-zone result lists saved as separate JSON Lines files:
+# file stem -> (results key, key of the list within that section)
+RESULT_SECTIONS = {
+    'needs_assessment': ('needs_assessment', 'prioritized_zones'),
+    'allocations': ('resource_allocation', 'allocations'),
+    'outcomes': ('delivery_outcomes', 'actual_results'),
+}
+
+
+def to_json(obj):
+    """Serialize obj as indented JSON text for embedding in prompts"""
+    return orjson.dumps(obj, option=PROMPT_JSON_OPTIONS).decode()
+
+
+def compression_enabled():
+    """Result files are zstd-compressed unless RESULTS_COMPRESS=0 (e.g. for debugging)"""
+    return os.getenv('RESULTS_COMPRESS', '1') != '0'
+
+
+def _default(obj):
+    """Serialize values orjson doesn't handle natively (e.g. other numpy types)"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def write_json(obj, path):
+    """
+    Write obj to path as compact JSON in a single serialization pass
+
+    Returns:
+        Path actually written: path + '.zst' when compression is enabled
+    """
+    return _write_bytes(orjson.dumps(obj, default=_default, option=RESULTS_JSON_OPTIONS), path)
+
+
+def write_jsonl(records, path):
+    """
+    Write records to path as JSON Lines, one compact object per line
+
+    Returns:
+        Path actually written: path + '.zst' when compression is enabled
+    """
+    data = b''.join(
+        orjson.dumps(record, default=_default, option=RESULTS_JSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        for record in records
+    )
+    return _write_bytes(data, path)
+
+
+def _write_bytes(data, path):
+    """Write serialized data, zstd-compressed unless disabled; returns the path written"""
+    if not compression_enabled():
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    path = f'{path}.zst'
+    with open(path, 'wb') as f, zstd.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f) as writer:
+        writer.write(data)
+    return path
+
+
+def read_json(path):
+    """Load a file written by write_json(), compressed or not"""
+    with open(path, 'rb') as f:
+        if str(path).endswith('.zst'):
+            with zstd.ZstdDecompressor().stream_reader(f) as reader:
+                return orjson.loads(reader.read())
+        return orjson.loads(f.read())
@@ -0,0 +1,121 @@
+"""
+LLM Cache - Persistent on-disk cache of prompt -> response pairs
+"""
+import hashlib
+import json
+import os
+import orjson
+from pathlib import Path
+from dotenv import load_dotenv
+from utils.file_utils import atomic_write
+from utils.llm_wrapper import Response
+
+load_dotenv()
+
+
+def cache_enabled():
+    """Caching is opt-in via LLM_CACHE=1"""
+    return os.getenv('LLM_CACHE', '0') == '1'
+
+
+def cache_dir():
+    """Directory holding cached responses"""
+    default = Path.home() / '.cache' / 'hum-aid' / 'llm'
+    return Path(os.getenv('LLM_CACHE_DIR', default))
+
+
+def cache_key(llm, prompt, options=None):
+    """
+    Content-addressed key; includes the backend, endpoint and model settings
+    to avoid cross-config hits (e.g. the same model name on Ollama and vLLM)
+    """
+    settings = json.dumps(options or {}, sort_keys=True)
+    backend = f"{type(llm).__name__}\0{getattr(llm, 'base_url', '')}"
+    material = f"{backend}\0{llm.model}\0{llm.temperature}\0{settings}\0{prompt}"
+    return hashlib.blake2b(material.encode()).hexdigest()
+
+
+def _cache_path(llm, prompt, options):
+    """Location of the entry for this prompt/options pair, or None if disabled"""
+    if not cache_enabled():
+        return None
+    return cache_dir() / f"{cache_key(llm, prompt, options)}.json"
+
+
+def _load(path):
+    """Stored response at path, or None on a miss"""
+    if path.exists():
+        try:
+            return Response(orjson.loads(path.read_bytes())['content'])
+        except (OSError, ValueError, KeyError):
+            pass  # Unreadable entry, regenerate it
+    return None
+
+
+def _store(path, llm, response):
+    """Persist a response for later runs; incomplete responses are skipped"""
+    if not response.complete:
+        return
+    atomic_write(path, orjson.dumps({'model': llm.model, 'content': response.content}))
+
+
+def cached_invoke(llm, prompt, **options):
+    """
+    Invoke the LLM, reusing a previously stored response for the same prompt
+    
+    Args:
+        llm: LocalLLM instance
+        prompt: Prompt text
+        **options: Extra LocalLLM.invoke arguments (also part of the key)
+        
+    Returns:
+        Response object with the generated text in .content
+    """
+    path = _cache_path(llm, prompt, options)
+    if path is None:
+        return llm.invoke(prompt, **options)
+    
+    response = _load(path)
+    if response is None:
+        response = llm.invoke(prompt, **options)
+        _store(path, llm, response)
+    
+    return response
+
+
+async def cached_ainvoke(llm, prompt, **options):
+    """Async counterpart of cached_invoke(); shares the same cache entries"""
+    path = _cache_path(llm, prompt, options)
+    if path is None:
+        return await llm.ainvoke(prompt, **options)
+    
+    response = _load(path)
+    if response is None:
+        response = await llm.ainvoke(prompt, **options)
+        _store(path, llm, response)
+    
+    return response
+
+
+async def cached_batch_ainvoke(llm, prompts, max_concurrency=8, **options):
+    """
+    Batched counterpart of cached_ainvoke(): cached prompts are answered
+    from disk and only the misses are sent, together, via llm.batch_invoke()
+    
+    Returns:
+        List of Response objects in prompt order
+    """
+    paths = [_cache_path(llm, prompt, options) for prompt in prompts]
+    responses = [None if path is None else _load(path) for path in paths]
+    
+    missing = [i for i, response in enumerate(responses) if response is None]
+    if missing:
+        fresh = await llm.batch_invoke(
+            [prompts[i] for i in missing], max_concurrency=max_concurrency, **options
+        )
+        for i, response in zip(missing, fresh):
+            responses[i] = response
+            if paths[i] is not None:
+                _store(paths[i], llm, response)
+    
+    return responses
@@ -0,0 +1,95 @@
+"""
+LLM Parse - Extract JSON payloads from LLM responses
+"""
+import re
+import orjson
+
+# Outermost JSON object or array, for responses wrapped in prose or code fences
+_JSON_BLOCK = re.compile(r'\{.*\}|\[.*\]', re.S)
+
+
+def parse_llm_json(content):
+    """
+    Parse JSON from an LLM response
+    
+    Args:
+        content: Raw response text
+        
+    Returns:
+        Decoded JSON value
+        
+    Raises:
+        json.JSONDecodeError: If no valid JSON could be extracted
+    """
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        # LLMs often wrap JSON in prose; retry on the outermost block
+        match = _JSON_BLOCK.search(content)
+        if match is None:
+            raise
+        try:
+            return orjson.loads(match.group(0))
+        except orjson.JSONDecodeError:
+            # Bracketed prose (e.g. "{as requested}") spoils the outermost
+            # block; take the first bracketed value that decodes instead
+            scanner = JSONEndScanner()
+            if scanner.feed(content):
+                return scanner.value
+            raise
+
+
+class JSONEndScanner:
+    """
+    Incrementally scans streamed text for the end of the first JSON value
+    
+    Tracks bracket depth outside of string literals. When a top-level
+    object or array closes, its text is decoded: bracketed prose such as
+    "{as requested}" fails to decode and scanning resumes after it, so a
+    streaming reader stops only once a real JSON value has arrived
+    instead of waiting for any trailing prose.
+    """
+    
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.complete = False
+        self.value = None       # first decoded JSON value, once complete
+        self._candidate = []    # characters of the bracketed span being scanned
+    
+    def feed(self, chunk):
+        """Scan the next chunk; True once the first JSON value has closed"""
+        for char in chunk:
+            if self.complete:
+                break
+            if self.depth > 0:
+                self._candidate.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                # Quotes only open JSON strings inside a value, not in leading prose
+                self.in_string = self.depth > 0
+            elif char in '{[':
+                if self.depth == 0:
+                    self._candidate = [char]
+                self.depth += 1
+            elif char in '}]' and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    self._close_candidate()
+        return self.complete
+    
+    def _close_candidate(self):
+        """Decode a closed top-level span; prose that doesn't decode is skipped"""
+        try:
+            self.value = orjson.loads(''.join(self._candidate))
+            self.complete = True
+        except orjson.JSONDecodeError:
+            pass
+        self._candidate = []
@@ -1,49 +1,564 @@
 """
-LLM Wrapper - Uses Ollama for free local inference
+LLM Wrapper - Uses Ollama (or a vLLM server) for free local inference
 """
-import json
+import asyncio
+import hashlib
 import requests
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import NamedTuple
+import aiohttp
+import orjson
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.llm_parse import JSONEndScanner
 
 load_dotenv()
 
 
+class Response(NamedTuple):
+    """
+    Response object similar to Anthropic's, exposing the text as .content
+    
+    complete is False when a JSON value was awaited but never arrived
+    (e.g. output cut off by max_tokens); such responses aren't cached.
+    """
+    content: str
+    complete: bool = True
+
+
+# Ollama tag suffix for each weight precision
+QUANTIZATION_TAGS = {
+    'fp16': 'fp16',
+    'int8': 'q8_0',
+    'int4': 'q4_K_M',
+}
+
+
+def quantized_model(model, quantization):
+    """
+    Ollama model tag for the requested weight precision
+    
+    Follows the library's "<name>:<size>-instruct-<quant>" naming, e.g.
+    llama3.2:3b + int8 -> llama3.2:3b-instruct-q8_0. Untagged names and
+    tags that already name a precision are left alone.
+    """
+    if quantization is None:
+        return model
+    suffix = QUANTIZATION_TAGS[quantization]
+    name, _, tag = model.partition(':')
+    if not tag or any(tag.endswith(s) for s in QUANTIZATION_TAGS.values()):
+        return model
+    return f"{name}:{tag}-instruct-{suffix}"
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of sending a request while the backend keeps failing"""
+
+
+class MalformedResponse(RuntimeError):
+    """Raised when the backend's reply can't be decoded (e.g. a truncated stream line)"""
+
+
+# Everything a client raises when a request can't be completed; agents
+# catch these to fall back to their non-LLM plans
+LLM_ERRORS = (requests.exceptions.RequestException, aiohttp.ClientError,
+              asyncio.TimeoutError, CircuitOpen, MalformedResponse)
+
+
 class LocalLLM:
     """Wrapper for local Ollama LLM"""
     
-    def __init__(self, model=None, temperature=0.3):
-        self.model = model or os.getenv('OLLAMA_MODEL', 'llama3.2:3b')
-        self.base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+    # Transient server states worth retrying (rate limited / overloaded)
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    
+    ENDPOINT = '/api/generate'
+    URL_ENV, DEFAULT_URL = 'OLLAMA_BASE_URL', 'http://localhost:11434'
+    MODEL_ENV, DEFAULT_MODEL = 'OLLAMA_MODEL', 'llama3.2:3b'
+    SERVER_HINT = "Make sure Ollama is running: ollama serve"
+    
+    # Keep-alive connections per host; enough for every concurrent agent call
+    POOL_SIZE = 16
+    
+    # (backend class, base_url, model) -> instance; entries go away with their last user
+    _shared = weakref.WeakValueDictionary()
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, model=None, temperature=0.3, max_tokens=512, max_retries=3,
+                 retry_backoff=1.0, base_url=None, quantization=None, cache_size=1024,
+                 cache_ttl=3600.0, failure_threshold=5, cooldown=30.0):
+        """
+        Args:
+            model: Ollama model tag (defaults to OLLAMA_MODEL)
+            temperature: Default sampling temperature
+            max_tokens: Default cap on generated tokens; agents pass their
+                        own per-request budget
+            max_retries: Retries for transient failures
+            retry_backoff: Initial backoff in seconds, doubled per retry
+            base_url: Ollama server URL (defaults to OLLAMA_BASE_URL)
+            quantization: 'fp16', 'int8' or 'int4' to select that build of
+                          the model; None uses the tag as given (Ollama's
+                          default tags are already int4 Q4_K_M)
+            cache_size: Responses kept in the in-memory cache (0 disables it)
+            cache_ttl: Seconds a cached response stays valid
+            failure_threshold: Consecutive failed requests (after retries)
+                               that open the circuit
+            cooldown: Seconds requests fail fast with CircuitOpen once the
+                      circuit is open; the next request then probes the server
+        """
+        self.model = self._model_name(model, quantization)
+        self.base_url = base_url or os.getenv(self.URL_ENV, self.DEFAULT_URL)
         self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Keep the model (and its prompt cache) resident between cycles
+        self.keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+        # Keep-alive connection pool reused by every sync request; transient
+        # statuses are retried with backoff by urllib3 (POST included, since
+        # generation requests are safe to repeat)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_SIZE, pool_maxsize=self.POOL_SIZE,
+            max_retries=Retry(total=max_retries, backoff_factor=retry_backoff,
+                              status_forcelist=self.RETRY_STATUSES, allowed_methods=None)
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        # One aiohttp session per event loop; sessions can't cross loops
+        self._aio_sessions = weakref.WeakKeyDictionary()
+        # In-process LRU of recent responses: request digest -> (expiry, Response)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        # Circuit breaker, so callers can fall back instead of waiting out
+        # timeouts against a server that is down
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._fail_count = 0
+        self._opened_at = None      # monotonic time the circuit opened
+        self._circuit_lock = threading.Lock()
         
-    def invoke(self, prompt):
-        """Send prompt to Ollama and get response"""
-        url = f"{self.base_url}/api/generate"
+    @classmethod
+    def shared(cls, quantization=None, model=None, base_url=None):
+        """
+        Process-wide instance for a (server, model) pair
         
+        Agents asking for the same backend get the same instance, so they
+        share its HTTP connections instead of each opening their own.
+        """
+        base_url = base_url or os.getenv(cls.URL_ENV, cls.DEFAULT_URL)
+        model = cls._model_name(model, quantization)
+        key = (cls, base_url, model)
+        with cls._shared_lock:
+            llm = cls._shared.get(key)
+            if llm is None:
+                llm = cls(model=model, base_url=base_url)
+                cls._shared[key] = llm
+            return llm
+    
+    @classmethod
+    def _model_name(cls, model, quantization):
+        """Model to request: the configured default, tagged for the precision"""
+        return quantized_model(model or os.getenv(cls.MODEL_ENV, cls.DEFAULT_MODEL), quantization)
+    
+    def _payload(self, prompt, temperature, max_tokens, json_mode, system, schema,
+                 stop=None, stream=False):
+        """Build the /api/generate request body"""
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False,
-            "temperature": self.temperature,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
             "options": {
-                "num_predict": 2048
+                "temperature": self.temperature if temperature is None else temperature,
+                "num_predict": max_tokens or self.max_tokens
             }
         }
+        if schema is not None:
+            payload["format"] = schema
+        elif json_mode:
+            payload["format"] = "json"
+        if system is not None:
+            payload["system"] = system
+        if stop:
+            payload["options"]["stop"] = list(stop)
+        return payload
+    
+    @staticmethod
+    def _stream_chunk(line):
+        """(text, done) from one line of a streamed response"""
+        if not line.strip():
+            return '', False
+        try:
+            chunk = orjson.loads(line)
+            return chunk.get('response', ''), chunk.get('done', False)
+        except (orjson.JSONDecodeError, AttributeError) as e:
+            raise MalformedResponse(f"Undecodable stream line: {line[:80]!r}") from e
+
+    
+    @staticmethod
+    def _memo_key(payload, stop_at_json):
+        """Digest of everything that shapes the response: model, prompt and options"""
+        material = orjson.dumps([payload, stop_at_json], option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(material, digest_size=16).digest()
+    
+    def _memo_get(self, key):
+        """Cached response for key, or None if absent or expired"""
+        with self._memo_lock:
+            entry = self._memo.get(key)
+            if entry is None:
+                return None
+            expires, response = entry
+            if expires < time.monotonic():
+                del self._memo[key]
+                return None
+            self._memo.move_to_end(key)
+            return response
+    
+    def _memo_put(self, key, response):
+        """Remember a response, evicting the least recently used beyond cache_size"""
+        with self._memo_lock:
+            self._memo[key] = (time.monotonic() + self.cache_ttl, response)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+    
+    @staticmethod
+    def join_modules(modules):
+        """Combine static prompt modules into one system prompt"""
+        return "\n\n".join(modules)
+    
+    def invoke_modular(self, modules, tail, **options):
+        """
+        Send a prompt made of static modules plus a per-call tail
+        
+        The modules go in the system field, ahead of the tail, so an
+        identical prefix lets Ollama reuse its cached attention state
+        instead of re-processing the static text every call.
+        
+        Args:
+            modules: List of static prompt sections
+            tail: Variable part of the prompt
+            **options: Extra invoke() arguments
+        """
+        return self.invoke(tail, system=self.join_modules(modules), **options)
+    
+    def _check_circuit(self):
+        """Raise CircuitOpen while the circuit is open and cooling down"""
+        with self._circuit_lock:
+            if self._opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpen(
+                    f"{self.base_url} failed {self._fail_count} requests in a row; "
+                    f"skipping requests for another {remaining:.0f}s"
+                )
+    
+    def _record_result(self, ok):
+        """Update the circuit breaker with the outcome of a request"""
+        with self._circuit_lock:
+            if ok:
+                self._fail_count = 0
+                self._opened_at = None
+            else:
+                self._fail_count += 1
+                if self._fail_count >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+    
+    def invoke(self, prompt, temperature=None, max_tokens=None, json_mode=False, system=None,
+               schema=None, stop=None, stop_at_json=True, use_cache=True):
+        """
+        Send prompt to Ollama and get response
+        
+        The response is streamed so generation can be cut short: decoding
+        halts at any stop sequence, and by default reading stops (and the
+        server aborts the request) as soon as the first JSON value closes.
+        
+        Args:
+            prompt: Prompt text
+            temperature: Sampling temperature (defaults to self.temperature)
+            max_tokens: Cap on generated tokens (defaults to self.max_tokens)
+            json_mode: Constrain the output to a valid JSON object
+            system: System prompt placed ahead of the prompt
+            schema: JSON Schema the output must match (grammar-constrained
+                    decoding; takes precedence over json_mode)
+            stop: Sequences that end generation when produced
+            stop_at_json: Return once the first complete JSON object/array
+                          has arrived, ignoring anything after it (bracketed
+                          text that doesn't decode as JSON doesn't count)
+            use_cache: Reuse an identical recent request's response from
+                       memory; disable for calls that should be resampled
         
+        Raises:
+            CircuitOpen: The server failed too many requests in a row and
+                         is being skipped for the cooldown period
+            MalformedResponse: A line of the stream couldn't be decoded
+                               (counted as a failed request)
+        """
+        url = f"{self.base_url}{self.ENDPOINT}"
+        payload = self._payload(prompt, temperature, max_tokens, json_mode, system, schema,
+                                stop=stop, stream=True)
+        key = self._memo_key(payload, stop_at_json) if use_cache and self.cache_size else None
+        if key is not None:
+            cached = self._memo_get(key)
+            if cached is not None:
+                return cached
+        
+        self._check_circuit()
         try:
-            response = requests.post(url, json=payload, timeout=120)
-            response.raise_for_status()
-            result = response.json()
+            with self._session.post(url, json=payload, timeout=120, stream=True) as response:
+                response.raise_for_status()
+                scanner = JSONEndScanner() if stop_at_json else None
+                parts = []
+                for line in response.iter_lines():
+                    text, done = self._stream_chunk(line)
+                    parts.append(text)
+                    if (scanner is not None and scanner.feed(text)) or done:
+                        break
+            self._record_result(ok=True)
             
-            # Create a response object similar to Anthropic
-            class Response:
-                def __init__(self, content):
-                    self.content = content
+            result = Response(''.join(parts), complete=scanner is None or scanner.complete)
+            if key is not None and result.complete:
+                self._memo_put(key, result)
+            return result
             
-            return Response(result['response'])
+        except (requests.exceptions.RequestException, MalformedResponse) as e:
+            self._record_result(ok=False)
+            print(f"⚠️  LLM request failed: {e}")
+            print(self.SERVER_HINT)
+            raise
+    
+    async def ainvoke(self, prompt, temperature=None, max_tokens=None, json_mode=False,
+                      system=None, schema=None, stop=None, stop_at_json=True, use_cache=True):
+        """
+        Async counterpart of invoke(), for issuing many requests concurrently
+        
+        Takes the same arguments as invoke(). Rate-limit/5xx responses and
+        connection failures are retried with exponential backoff; raises
+        CircuitOpen like invoke().
+        """
+        payload = self._payload(prompt, temperature, max_tokens, json_mode, system, schema,
+                                stop=stop, stream=True)
+        key = self._memo_key(payload, stop_at_json) if use_cache and self.cache_size else None
+        if key is not None:
+            cached = self._memo_get(key)
+            if cached is not None:
+                return cached
+        
+        async def read_stream(response):
+            scanner = JSONEndScanner() if stop_at_json else None
+            parts = []
+            async for line in response.content:
+                text, done = self._stream_chunk(line)
+                parts.append(text)
+                if (scanner is not None and scanner.feed(text)) or done:
+                    break
+            return Response(''.join(parts), complete=scanner is None or scanner.complete)
+        
+        result = await self._apost(payload, read=read_stream)
+        if key is not None and result.complete:
+            self._memo_put(key, result)
+        return result
+    
+    async def batch_invoke(self, prompts, max_concurrency=8, **options):
+        """
+        Send several independent prompts concurrently
+        
+        Args:
+            prompts: List of prompt texts
+            max_concurrency: Maximum requests in flight at once
+            **options: Extra ainvoke() arguments, applied to every prompt
+            
+        Returns:
+            List of Response objects in prompt order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def invoke_one(prompt):
+            async with semaphore:
+                return await self.ainvoke(prompt, **options)
+        
+        return list(await asyncio.gather(*(invoke_one(prompt) for prompt in prompts)))
+    
+    async def _apost(self, payload, read=None):
+        """
+        POST a request body, retrying transient failures
+        
+        Returns the decoded JSON response, or what the read coroutine
+        function makes of the response when one is given.
+        """
+        url = f"{self.base_url}{self.ENDPOINT}"
+        self._check_circuit()
+        session = self._aio_session()
+        
+        for attempt in range(self.max_retries + 1):
+            retry = attempt < self.max_retries
+            try:
+                async with session.post(url, json=payload) as response:
+                    if response.status in self.RETRY_STATUSES and retry:
+                        await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                        continue
+                    response.raise_for_status()
+                    if read is not None:
+                        result = await read(response)
+                    else:
+                        body = await response.read()
+                        try:
+                            result = orjson.loads(body)
+                        except orjson.JSONDecodeError as e:
+                            raise MalformedResponse(f"Undecodable response: {body[:80]!r}") from e
+                self._record_result(ok=True)
+                return result
             
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️  Ollama request failed: {e}")
-            print("Make sure Ollama is running: ollama serve")
-            raise
\ No newline at end of file
+            except aiohttp.ClientConnectionError as e:
+                if retry:
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                self._record_result(ok=False)
+                print(f"⚠️  LLM request failed: {e}")
+                print(self.SERVER_HINT)
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, MalformedResponse) as e:
+                self._record_result(ok=False)
+                print(f"⚠️  LLM request failed: {e}")
+                print(self.SERVER_HINT)
+                raise
+    
+    def _aio_session(self):
+        """Session bound to the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        session = self._aio_sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+            self._aio_sessions[loop] = session
+        return session
+    
+    def close(self):
+        """Release the pooled sync connections"""
+        self._session.close()
+    
+    async def aclose(self):
+        """Close the aiohttp session of the running event loop"""
+        session = self._aio_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+class VLLMBackend(LocalLLM):
+    """
+    Client for a vLLM OpenAI-compatible server (/v1/completions)
+    
+    vLLM batches concurrent requests on the GPU (continuous batching), so
+    agents issuing prompts at the same time share forward passes instead
+    of queueing behind each other as they do on Ollama.
+    """
+    
+    ENDPOINT = '/v1/completions'
+    URL_ENV, DEFAULT_URL = 'VLLM_URL', 'http://localhost:8000'
+    MODEL_ENV, DEFAULT_MODEL = 'VLLM_MODEL', 'meta-llama/Llama-3.2-3B-Instruct'
+    SERVER_HINT = "Make sure vLLM is running: vllm serve <model>"
+    
+    @classmethod
+    def _model_name(cls, model, quantization):
+        """vLLM picks the precision when the server loads the model; names are used as given"""
+        return model or os.getenv(cls.MODEL_ENV, cls.DEFAULT_MODEL)
+    
+    def _payload(self, prompt, temperature, max_tokens, json_mode, system, schema,
+                 stop=None, stream=False):
+        """Build the /v1/completions request body"""
+        payload = {
+            "model": self.model,
+            "prompt": (
+                [self._with_system(p, system) for p in prompt] if isinstance(prompt, list)
+                else self._with_system(prompt, system)
+            ),
+            "temperature": self.temperature if temperature is None else temperature,
+            "max_tokens": max_tokens or self.max_tokens,
+            "stream": stream
+        }
+        if stop:
+            payload["stop"] = list(stop)
+        if schema is not None:
+            payload["guided_json"] = schema
+        elif json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+    
+    @staticmethod
+    def _with_system(prompt, system):
+        # The completions API has no system field; a leading system prompt
+        # still forms a shared prefix for vLLM's prefix cache
+        return prompt if system is None else f"{system}\n\n{prompt}"
+    
+    @staticmethod
+    def _stream_chunk(line):
+        # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+        line = line.strip()
+        if not line.startswith(b'data:'):
+            return '', False
+        data = line[5:].strip()
+        if data == b'[DONE]':
+            return '', True
+        try:
+            return orjson.loads(data)['choices'][0]['text'], False
+        except (orjson.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+            raise MalformedResponse(f"Undecodable stream line: {line[:80]!r}") from e
+    
+    async def batch_invoke(self, prompts, max_concurrency=8, stop_at_json=True, use_cache=True,
+                           **options):
+        """
+        Send several prompts as one /v1/completions request
+        
+        vLLM schedules the prompts of a list request together, so the batch
+        costs one round trip; max_concurrency is accepted for interface
+        compatibility with LocalLLM.batch_invoke(). The batch is not
+        streamed, so stop_at_json has no effect; use stop to end early.
+        
+        Args:
+            prompts: List of prompt texts
+            use_cache: Answer prompts seen recently from memory and send
+                       only the rest, as invoke() does
+            **options: Other invoke() arguments (temperature, max_tokens,
+                       json_mode, system, schema, stop), applied to every prompt
+            
+        Returns:
+            List of Response objects in prompt order
+        """
+        prompts = list(prompts)
+        keys = [
+            self._memo_key(self._batch_payload(prompt, **options), False)
+            if use_cache and self.cache_size else None
+            for prompt in prompts
+        ]
+        responses = [None if key is None else self._memo_get(key) for key in keys]
+        
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if missing:
+            payload = self._batch_payload([prompts[i] for i in missing], **options)
+            choices = (await self._apost(payload))['choices']
+            for i, choice in zip(missing, sorted(choices, key=lambda c: c['index'])):
+                responses[i] = Response(choice['text'])
+                if keys[i] is not None:
+                    self._memo_put(keys[i], responses[i])
+        return responses
+    
+    def _batch_payload(self, prompt, temperature=None, max_tokens=None, json_mode=False,
+                       system=None, schema=None, stop=None):
+        """Non-streamed request body for one prompt or a list of prompts"""
+        return self._payload(prompt, temperature, max_tokens, json_mode, system, schema, stop=stop)
+
+def backend_class(name=None):
+    """LLM client class for LLM_BACKEND ('ollama' or 'vllm')"""
+    name = (name or os.getenv('LLM_BACKEND', 'ollama')).lower()
+    if name == 'vllm':
+        return VLLMBackend
+    if name == 'ollama':
+        return LocalLLM
+    raise ValueError(f"Unknown LLM backend: {name}")
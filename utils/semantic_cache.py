@@ -0,0 +1,92 @@
+"""
+Semantic Cache - Reuses LLM responses for near-identical planning inputs
+"""
+import os
+import pickle
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from utils.file_utils import atomic_write
+from utils.llm_cache import cache_dir
+
+load_dotenv()
+
+
+def semantic_cache_enabled():
+    """Semantic reuse is opt-in via SEMANTIC_CACHE=1"""
+    return os.getenv('SEMANTIC_CACHE', '0') == '1'
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of responses keyed by a feature vector
+
+    Entries are grouped by an exact signature (e.g. the zone IDs in the
+    prompt); within a group the stored response whose vector is closest
+    to the query is returned if every component is within the tolerance.
+    Components are compared in absolute terms, so a large change in any
+    single one (e.g. one zone's priority) is a miss.
+    """
+
+    def __init__(self, name, tolerance=None, max_entries=512):
+        """
+        Args:
+            name: Cache file name under the LLM cache directory
+            tolerance: Largest per-component difference for a hit
+                       (defaults to SEMANTIC_CACHE_TOLERANCE or 5)
+            max_entries: Entries kept per signature, oldest dropped first
+        """
+        self.enabled = semantic_cache_enabled()
+        if tolerance is None:
+            tolerance = os.getenv('SEMANTIC_CACHE_TOLERANCE', 5)
+        self.tolerance = float(tolerance)
+        self.max_entries = max_entries
+        # Entries from the earlier cosine-similarity format aren't comparable
+        self.path = cache_dir().parent / f'{name}.semantic-v2.pkl'
+        self._lock = threading.Lock()
+        # signature -> (vectors [n, d] float32, responses [n])
+        self._entries = self._load() if self.enabled else {}
+
+    def lookup(self, signature, key_vec):
+        """Cached response text for the closest match, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is None:
+                return None
+            vectors, responses = entry
+            distance = np.abs(vectors - np.asarray(key_vec, dtype=np.float32)).max(axis=1)
+
+        best = int(distance.argmin())
+        if distance[best] <= self.tolerance:
+            return responses[best]
+        return None
+
+    def store(self, signature, key_vec, response_text):
+        """Remember a response and persist the cache"""
+        if not self.enabled:
+            return
+
+        query = np.asarray(key_vec, dtype=np.float32)[np.newaxis, :]
+        with self._lock:
+            vectors, responses = self._entries.get(
+                signature, (np.empty((0, query.shape[1]), dtype=np.float32), [])
+            )
+            vectors = np.vstack([vectors, query])[-self.max_entries:]
+            responses = (responses + [response_text])[-self.max_entries:]
+            self._entries[signature] = (vectors, responses)
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # Missing, truncated or written by an incompatible version;
+            # unpickling can fail in many ways, so start from an empty cache
+            return {}
+
+    def _save(self):
+        atomic_write(self.path, pickle.dumps(self._entries, protocol=pickle.HIGHEST_PROTOCOL))
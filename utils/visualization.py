@@ -6,8 +6,29 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import pandas as pd
-import json
+import gzip
+import os
+from functools import cached_property
 import numpy as np
+from utils.json_utils import RESULT_SECTIONS, read_json
+
+
+def _write_html(fig, output_file):
+    """
+    Save a figure as HTML that loads plotly.js from the CDN instead of
+    embedding ~3 MB of it, plus a gzipped copy for web servers
+    """
+    html = fig.to_html(include_plotlyjs='cdn', full_html=True,
+                       config={'responsive': True}).encode()
+    with open(output_file, 'wb') as f:
+        f.write(html)
+    _write_gz(html, output_file)
+
+
+def _write_gz(data, path):
+    """Write data to path + '.gz', ready to serve with Content-Encoding: gzip"""
+    with gzip.open(f'{path}.gz', 'wb', compresslevel=6) as f:
+        f.write(data)
 
 
 class HumanitarianDashboard:
@@ -18,13 +39,84 @@ class HumanitarianDashboard:
         Initialize dashboard with cycle results
         
         Args:
-            results_data: Dictionary or JSON file path with cycle results
+            results_data: Results dictionary, or path of a cycle manifest
+                          (or of a single-file .json/.json.zst results file)
         """
-        if isinstance(results_data, str):
-            with open(results_data, 'r') as f:
-                self.data = json.load(f)
+        if isinstance(results_data, (str, os.PathLike)):
+            self.data = read_json(results_data)
+            self.results_dir = os.path.dirname(results_data)
         else:
             self.data = results_data
+            self.results_dir = None
+    
+    def _zone_records(self):
+        """Zone records, embedded in the results or from the referenced snapshot file"""
+        settlement = self.data['settlement_data']
+        if 'zones_data' in settlement:
+            return settlement['zones_data']
+        
+        # The snapshot path is relative to the manifest's directory
+        return read_json(os.path.join(self.results_dir, settlement['zones_snapshot']))
+    
+    def _section_df(self, stem):
+        """One of RESULT_SECTIONS as a frame, from its JSON Lines file or the embedded list"""
+        sections = self.data.get('sections')
+        if sections is not None:
+            return pd.read_json(os.path.join(self.results_dir, sections[stem]),
+                                lines=True, convert_dates=False)
+        section, key = RESULT_SECTIONS[stem]
+        return pd.DataFrame(self.data[section][key])
+    
+    # Frames derived from the results, built on first use and shared by
+    # every chart drawn from this dashboard
+    
+    @cached_property
+    def zones_df(self):
+        """Settlement zone records"""
+        return pd.DataFrame(self._zone_records())
+    
+    @cached_property
+    def zone_coords(self):
+        """Zone longitudes and latitudes as arrays, in zones_df row order"""
+        return (self.zones_df['longitude'].to_numpy(dtype=float),
+                self.zones_df['latitude'].to_numpy(dtype=float))
+    
+    @cached_property
+    def zone_positions(self):
+        """Row of each zone in zones_df, by zone ID"""
+        return {zone_id: i for i, zone_id in enumerate(self.zones_df['zone_id'])}
+    
+    @cached_property
+    def depot(self):
+        """Distribution center (longitude, latitude), at the centroid of the zones"""
+        lons, lats = self.zone_coords
+        return float(lons.mean()), float(lats.mean())
+    
+    @cached_property
+    def priorities_df(self):
+        """Ten highest-priority zone assessments"""
+        return self._section_df('needs_assessment').head(10)
+    
+    @cached_property
+    def allocations_df(self):
+        """Planned allocation per zone"""
+        return self._section_df('allocations')
+    
+    @cached_property
+    def outcomes_df(self):
+        """Actual delivery outcome per zone"""
+        return self._section_df('outcomes')
+    
+    @cached_property
+    def resource_totals(self):
+        """Total planned quantity per resource type"""
+        # Numeric columns other than the priority score are resource quantities
+        return (
+            self.allocations_df
+            .select_dtypes(include='number')
+            .drop(columns=['priority_score'], errors='ignore')
+            .sum()
+        )
     
     def create_comprehensive_dashboard(self, output_file='outputs/dashboard.html'):
         """Create comprehensive multi-panel dashboard"""
@@ -48,125 +140,17 @@ class HumanitarianDashboard:
             row_heights=[0.35, 0.35, 0.30]
         )
         
-        # Extract data
-        zones_data = self.data['needs_assessment']['prioritized_zones'][:10]
-        allocations = self.data['resource_allocation']['allocations']
-        outcomes = self.data['delivery_outcomes']['actual_results']
-        performance = self.data['performance_metrics']
-        
-        # 1. Priority Scores Bar Chart
-        zone_ids = [z['zone_id'] for z in zones_data]
-        priorities = [z['priority_score'] for z in zones_data]
-        
-        fig.add_trace(
-            go.Bar(
-                x=zone_ids,
-                y=priorities,
-                marker_color='indianred',
-                name='Priority Score',
-                text=[f"{p:.0f}" for p in priorities],
-                textposition='outside',
-                hovertemplate='<b>%{x}</b><br>Priority: %{y:.1f}<extra></extra>'
-            ),
-            row=1, col=1
-        )
-        
-        # 2. Resource Distribution Pie Chart
-        resource_totals = {}
-        for alloc in allocations:
-            for key, value in alloc.items():
-                if key not in ['zone_id', 'zone_name', 'priority_score', 'justification'] and isinstance(value, (int, float)):
-                    resource_totals[key] = resource_totals.get(key, 0) + value
-        
-        fig.add_trace(
-            go.Pie(
-                labels=list(resource_totals.keys()),
-                values=list(resource_totals.values()),
-                hole=0.3,
-                marker=dict(colors=px.colors.qualitative.Set3),
-                hovertemplate='<b>%{label}</b><br>Quantity: %{value:,}<br>Percentage: %{percent}<extra></extra>'
-            ),
-            row=1, col=2
-        )
-        
-        # 3. Delivery Success Bar Chart
-        outcome_zones = [o['zone_id'] for o in outcomes]
-        success_rates = [o['delivered_percentage'] for o in outcomes]
-        colors = ['green' if s >= 95 else 'orange' if s >= 75 else 'red' for s in success_rates]
-        
-        fig.add_trace(
-            go.Bar(
-                x=outcome_zones,
-                y=success_rates,
-                marker_color=colors,
-                name='Delivery Success',
-                text=[f"{s:.0f}%" for s in success_rates],
-                textposition='outside',
-                hovertemplate='<b>%{x}</b><br>Delivered: %{y:.1f}%<extra></extra>'
-            ),
-            row=2, col=1
-        )
-        
-        # 4. Resource Type Breakdown
-        resource_names = list(resource_totals.keys())[:5]
-        resource_values = [resource_totals[name] for name in resource_names]
-        
-        fig.add_trace(
-            go.Bar(
-                x=resource_names,
-                y=resource_values,
-                marker_color='lightseagreen',
-                name='Resources',
-                text=[f"{v:,.0f}" for v in resource_values],
-                textposition='outside',
-                hovertemplate='<b>%{x}</b><br>Quantity: %{y:,}<extra></extra>'
-            ),
-            row=2, col=2
-        )
-        
-        # 5. Challenges Pie Chart
-        challenges = {}
-        for outcome in outcomes:
-            challenge = outcome.get('challenges', 'none')
-            challenges[challenge] = challenges.get(challenge, 0) + 1
-        
-        fig.add_trace(
-            go.Pie(
-                labels=list(challenges.keys()),
-                values=list(challenges.values()),
-                hole=0.3,
-                marker=dict(colors=px.colors.qualitative.Pastel),
-                hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
-            ),
-            row=3, col=1
-        )
-        
-        # 6. Success Rate Indicator
-        success_rate = performance['success_rate']
-        
-        fig.add_trace(
-            go.Indicator(
-                mode="gauge+number+delta",
-                value=success_rate,
-                title={'text': "Overall Success Rate"},
-                delta={'reference': 85},
-                gauge={
-                    'axis': {'range': [None, 100]},
-                    'bar': {'color': "darkblue"},
-                    'steps': [
-                        {'range': [0, 60], 'color': "lightgray"},
-                        {'range': [60, 80], 'color': "lightblue"},
-                        {'range': [80, 100], 'color': "lightgreen"}
-                    ],
-                    'threshold': {
-                        'line': {'color': "red", 'width': 4},
-                        'thickness': 0.75,
-                        'value': 90
-                    }
-                }
-            ),
-            row=3, col=2
+        # Add the six panels
+        panels = (
+            (self._priority_bar, 1, 1),
+            (self._resource_pie, 1, 2),
+            (self._delivery_success_bar, 2, 1),
+            (self._resource_breakdown_bar, 2, 2),
+            (self._challenges_pie, 3, 1),
+            (self._success_indicator, 3, 2),
         )
+        for build, row, col in panels:
+            fig.add_trace(build(), row=row, col=col)
         
         # Update layout
         cycle_num = self.data.get('cycle_number', 1)
@@ -189,15 +173,105 @@ class HumanitarianDashboard:
         fig.update_yaxes(title_text="Quantity", row=2, col=2)
         
         # Save dashboard
-        fig.write_html(output_file)
+        _write_html(fig, output_file)
         print(f"✓ Dashboard saved to: {output_file}")
         
         return fig
     
+    def _priority_bar(self):
+        """Priority score of the top zones"""
+        zones_df = self.priorities_df
+        return go.Bar(
+            x=zones_df['zone_id'],
+            y=zones_df['priority_score'],
+            marker_color='indianred',
+            name='Priority Score',
+            text=zones_df['priority_score'].map('{:.0f}'.format),
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>Priority: %{y:.1f}<extra></extra>'
+        )
+    
+    def _resource_pie(self):
+        """Share of each resource type in the allocation"""
+        resource_totals = self.resource_totals
+        return go.Pie(
+            labels=resource_totals.index.tolist(),
+            values=resource_totals.tolist(),
+            hole=0.3,
+            marker=dict(colors=px.colors.qualitative.Set3),
+            hovertemplate='<b>%{label}</b><br>Quantity: %{value:,}<br>Percentage: %{percent}<extra></extra>'
+        )
+    
+    def _delivery_success_bar(self):
+        """Delivered percentage per zone, colored by delivery status"""
+        outcomes_df = self.outcomes_df
+        success_rates = outcomes_df['delivered_percentage']
+        colors = np.select([success_rates >= 95, success_rates >= 75], ['green', 'orange'],
+                           default='red')
+        return go.Bar(
+            x=outcomes_df['zone_id'],
+            y=success_rates,
+            marker_color=colors,
+            name='Delivery Success',
+            text=success_rates.map('{:.0f}%'.format),
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>Delivered: %{y:.1f}%<extra></extra>'
+        )
+    
+    def _resource_breakdown_bar(self):
+        """Five largest resource totals"""
+        top_resources = self.resource_totals.nlargest(5)
+        resource_values = top_resources.tolist()
+        return go.Bar(
+            x=top_resources.index.tolist(),
+            y=resource_values,
+            marker_color='lightseagreen',
+            name='Resources',
+            text=[f"{v:,.0f}" for v in resource_values],
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>Quantity: %{y:,}<extra></extra>'
+        )
+    
+    def _challenges_pie(self):
+        """How often each delivery challenge occurred"""
+        # Unsorted counts keep first-seen order, so slice colors stay stable
+        challenges = self.outcomes_df['challenges'].fillna('none').value_counts(sort=False)
+        
+        return go.Pie(
+            labels=challenges.index.tolist(),
+            values=challenges.tolist(),
+            hole=0.3,
+            marker=dict(colors=px.colors.qualitative.Pastel),
+            hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
+        )
+    
+    def _success_indicator(self):
+        """Gauge of the overall success rate"""
+        return go.Indicator(
+            mode="gauge+number+delta",
+            value=self.data['performance_metrics']['success_rate'],
+            title={'text': "Overall Success Rate"},
+            delta={'reference': 85},
+            gauge={
+                'axis': {'range': [None, 100]},
+                'bar': {'color': "darkblue"},
+                'steps': [
+                    {'range': [0, 60], 'color': "lightgray"},
+                    {'range': [60, 80], 'color': "lightblue"},
+                    {'range': [80, 100], 'color': "lightgreen"}
+                ],
+                'threshold': {
+                    'line': {'color': "red", 'width': 4},
+                    'thickness': 0.75,
+                    'value': 90
+                }
+            }
+        )
+    
     def create_route_map(self, output_file='outputs/route_map.html'):
         """Create delivery route visualization"""
         
-        zones_data = pd.DataFrame(self.data['settlement_data']['zones_data'])
+        zones_data = self.zones_df
         delivery_plan = self.data['logistics_plan']['delivery_plan']
         
         # Create scatter map
@@ -219,8 +293,7 @@ class HumanitarianDashboard:
         ))
         
         # Add depot
-        depot_lon = zones_data['longitude'].mean()
-        depot_lat = zones_data['latitude'].mean()
+        depot_lon, depot_lat = self.depot
         
         fig.add_trace(go.Scattergeo(
             lon=[depot_lon],
@@ -232,15 +305,16 @@ class HumanitarianDashboard:
             name='Depot'
         ))
         
-        # Add routes
+        # Add routes, looking zones up by ID in visiting order
         colors = px.colors.qualitative.Set1
+        zone_lons, zone_lats = self.zone_coords
+        positions = self.zone_positions
         for i, route in enumerate(delivery_plan['routes']):
-            route_zones = route['zones_sequence']
-            route_zone_data = zones_data[zones_data['zone_id'].isin(route_zones)]
+            rows = [positions[z] for z in route['zones_sequence'] if z in positions]
             
             # Create route line
-            lons = [depot_lon] + list(route_zone_data['longitude']) + [depot_lon]
-            lats = [depot_lat] + list(route_zone_data['latitude']) + [depot_lat]
+            lons = np.concatenate(([depot_lon], zone_lons[rows], [depot_lon]))
+            lats = np.concatenate(([depot_lat], zone_lats[rows], [depot_lat]))
             
             fig.add_trace(go.Scattergeo(
                 lon=lons,
@@ -263,7 +337,7 @@ class HumanitarianDashboard:
             height=700
         )
         
-        fig.write_html(output_file)
+        _write_html(fig, output_file)
         print(f"✓ Route map saved to: {output_file}")
         
         return fig
@@ -283,8 +357,9 @@ class HumanitarianDashboard:
             subplot_titles=('Success Rate Over Time', 'Population Served Over Time')
         )
         
+        # WebGL rendering keeps long multi-cycle runs responsive
         fig.add_trace(
-            go.Scatter(
+            go.Scattergl(
                 x=cycles,
                 y=success_rates,
                 mode='lines+markers',
@@ -315,19 +390,20 @@ class HumanitarianDashboard:
             showlegend=False
         )
         
-        fig.write_html(output_file)
+        _write_html(fig, output_file)
         print(f"✓ Timeline saved to: {output_file}")
         
         return fig
 
 
-def visualize_results(results_file_or_data, create_all=True):
+def visualize_results(results_file_or_data, create_all=True, output_dir='outputs'):
     """
     Convenience function to create all visualizations
     
     Args:
         results_file_or_data: Path to JSON file or results dictionary
         create_all: Create all available visualizations
+        output_dir: Directory the HTML files are written to
     """
     dashboard = HumanitarianDashboard(results_file_or_data)
     
@@ -335,8 +411,12 @@ def visualize_results(results_file_or_data, create_all=True):
     
     if create_all:
         print("\n📊 Creating visualizations...")
-        visualizations.append(dashboard.create_comprehensive_dashboard())
-        visualizations.append(dashboard.create_route_map())
+        visualizations.append(dashboard.create_comprehensive_dashboard(
+            os.path.join(output_dir, 'dashboard.html')
+        ))
+        visualizations.append(dashboard.create_route_map(
+            os.path.join(output_dir, 'route_map.html')
+        ))
     
     return visualizations
 